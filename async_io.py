@@ -0,0 +1,52 @@
+"""
+Модуль неблокирующих файловых операций.
+
+Операции выполняются в пуле потоков, чтобы медленный диск не задерживал
+обработку обновлений других пользователей.
+"""
+import os
+import asyncio
+
+async def path_exists(path: str) -> bool:
+    """
+    Проверяет существование файла.
+
+    Args:
+        path: Путь к файлу
+
+    Returns:
+        bool: True, если файл существует
+    """
+    return await asyncio.to_thread(os.path.exists, path)
+
+def _read_bytes(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+async def read_bytes(path: str) -> bytes:
+    """
+    Читает файл целиком.
+
+    Args:
+        path: Путь к файлу
+
+    Returns:
+        bytes: Содержимое файла
+    """
+    return await asyncio.to_thread(_read_bytes, path)
+
+def _append_text(path: str, text: str, encoding: str) -> None:
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a', encoding=encoding) as f:
+        f.write(text)
+
+async def append_text(path: str, text: str, encoding: str = 'utf-8') -> None:
+    """
+    Дописывает текст в конец файла, создавая каталог при необходимости.
+
+    Args:
+        path: Путь к файлу
+        text: Текст для записи
+        encoding: Кодировка файла
+    """
+    await asyncio.to_thread(_append_text, path, text, encoding)
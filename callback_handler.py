@@ -2,31 +2,111 @@
 Модуль для обработки callback-запросов.
 """
 import os
+import re
+import html
 import logging
 from typing import List, Dict, Any, Optional, Tuple, Union
 
 from telegram import (
-    Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
+    Update, CallbackQuery, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
 )
+from telegram.error import BadRequest
 from telegram.ext import ContextTypes
 
 from config import Config
 from utils.database import Database
 from utils.user_manager import UserManager
 from utils.logging_utils import log_user_action
+from utils.metrics import metrics, callback_prefix
+from utils.media_cache import MediaCache
+from utils.async_io import path_exists
+from handlers.keyboards import choice_rows
 from handlers.message_handler import MessageHandler
 from utils.synonyms import SynonymManager
 from utils.text_utils import translit_ru_to_en
 
 logger = logging.getLogger(__name__)
 
+# Максимальная длина подписи к фото в Telegram
+CAPTION_LIMIT = 1024
+_TAG_RE = re.compile(r"<[^>]+>")
+
+def caption_length(text: str, parse_mode: Optional[str] = None) -> int:
+    """
+    Считает длину текста так, как ее считает Telegram: без HTML-разметки, в единицах UTF-16.
+    
+    Args:
+        text: Текст сообщения
+        parse_mode: Режим разметки; для 'HTML' теги не учитываются
+        
+    Returns:
+        int: Длина текста
+    """
+    if parse_mode == 'HTML':
+        text = html.unescape(_TAG_RE.sub("", text))
+    return len(text.encode('utf-16-le')) // 2
+
 class CallbackHandler:
     """Класс для обработки callback-запросов."""
     
-    def __init__(self, database: Database, user_manager: UserManager, synonym_manager: SynonymManager):
+    def __init__(self, database: Database, user_manager: UserManager, synonym_manager: SynonymManager,
+                 media_cache: Optional[MediaCache] = None):
         self.db = database
         self.user_manager = user_manager
         self.synonym_manager = synonym_manager
+        self.media_cache = media_cache or MediaCache()
+        self.message_handler = MessageHandler(database, user_manager, synonym_manager)
+
+    async def _render(self, query: CallbackQuery, text: str,
+                      reply_markup: Optional[InlineKeyboardMarkup] = None, parse_mode: Optional[str] = None,
+                      photo_path: Optional[str] = None) -> None:
+        """
+        Показывает шаг подбора, по возможности редактируя сообщение с кнопкой на месте.
+        
+        В режиме карточек (Config.CARD_MODE, включен по умолчанию) шаг с картинкой — это одно
+        фото с подписью и кнопками: карточка меняется через edit_message_media, а из текстового
+        сообщения отправляется новая. Шаг без картинки редактирует подпись карточки или текст
+        сообщения. Текст длиннее CAPTION_LIMIT не помещается в подпись, поэтому картинка
+        отправляется отдельно, как и без режима карточек.
+        
+        Args:
+            query: Объект callback-запроса
+            text: Текст сообщения
+            reply_markup: Клавиатура
+            parse_mode: Режим разметки
+            photo_path: Путь к картинке шага
+        """
+        message = query.message
+        fits_caption = caption_length(text, parse_mode) <= CAPTION_LIMIT
+        try:
+            if photo_path and getattr(Config, 'CARD_MODE', True) and fits_caption:
+                if message.photo:
+                    await self.media_cache.send(photo_path, lambda media: message.edit_media(
+                        InputMediaPhoto(media, caption=text, parse_mode=parse_mode),
+                        reply_markup=reply_markup
+                    ))
+                else:
+                    await self.media_cache.send(photo_path, lambda photo: message.reply_photo(
+                        photo=photo, caption=text, parse_mode=parse_mode, reply_markup=reply_markup
+                    ))
+                return
+            if photo_path:
+                await self.media_cache.send(photo_path, lambda photo: message.reply_photo(photo=photo))
+            if not message.photo:
+                await message.edit_text(text, parse_mode=parse_mode, reply_markup=reply_markup)
+            elif fits_caption and not photo_path:
+                await message.edit_caption(caption=text, parse_mode=parse_mode, reply_markup=reply_markup)
+            else:
+                await message.reply_text(text, parse_mode=parse_mode, reply_markup=reply_markup)
+        except BadRequest as e:
+            # Повторное нажатие той же кнопки не меняет сообщение
+            if "not modified" not in str(e).lower():
+                raise
+
+    @staticmethod
+    def _car_key(store: Dict[str, Any]) -> Tuple[Any, Any, Any]:
+        """Возвращает ключ автомобиля (марка, модель, годы) из данных callback."""
+        return store.get('brand', ''), store.get('model', ''), store.get('years', '')
 
     def translit_ru_to_en(text):
         # Простейший пример, замени на свою функцию если есть в utils.text_utils
@@ -38,6 +118,11 @@ class CallbackHandler:
 
     async def handle_callback_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         query = update.callback_query
+        with metrics.timer("bot_callback_seconds", prefix=callback_prefix(query.data or "")):
+            await self._dispatch_callback_query(query, update, context)
+
+    async def _dispatch_callback_query(self, query: CallbackQuery, update: Update,
+                                       context: ContextTypes.DEFAULT_TYPE) -> None:
         user = query.from_user
         try:
             await query.answer()
@@ -45,6 +130,8 @@ class CallbackHandler:
                 return
             data = query.data
             log_user_action(user.id, user.username, "BUTTON_CLICK", data)
+            # Идентификатор данных кнопки всегда стоит после последнего "_"
+            await self.user_manager.restore_callback_data(data.rsplit("_", 1)[-1])
             # --- ПОСТРАНИЧНЫЙ ВЫВОД МОДЕЛЕЙ ---
             if data.startswith("models_page_"):
                 parts = data.split("_")
@@ -52,22 +139,16 @@ class CallbackHandler:
                 brand_query_raw = "_".join(parts[3:])  # Может быть кириллица
 
                 # --- НОРМАЛИЗАЦИЯ БРЕНДА ---
-                synonyms = self.synonym_manager.get_synonyms()
                 brand_query_norm = brand_query_raw.strip().lower()
                 canonical_brand = None
 
                 # 1. Прямое совпадение
-                all_brands = [b.lower() for b in self.db.cars_df['brand'].unique()]
+                all_brands = self.db.catalog.brands
                 if brand_query_norm in all_brands:
                     canonical_brand = brand_query_norm
                 else:
                     # 2. Поиск по синонимам
-                    for canon, syns in synonyms.items():
-                        all_syns = [canon] + (syns if isinstance(syns, list) else [syns])
-                        all_syns_norm = [s.lower() for s in all_syns]
-                        if brand_query_norm in all_syns_norm:
-                            canonical_brand = canon.lower()
-                            break
+                    canonical_brand = self.synonym_manager.get_snapshot().resolve_brand(brand_query_norm)
                 # 3. Если не нашли — пробуем транслит
                 if not canonical_brand and any('а' <= x <= 'я' for x in brand_query_norm):
                     brand_query_translit = translit_ru_to_en(brand_query_norm)
@@ -75,20 +156,18 @@ class CallbackHandler:
                         canonical_brand = brand_query_translit
                 # 4. Если всё равно не нашли — ищем частичное совпадение
                 if not canonical_brand:
-                    for brand in self.db.cars_df['brand'].unique():
-                        if brand_query_norm in brand.lower():
-                            canonical_brand = brand.lower()
+                    for brand_lower in all_brands:
+                        if brand_query_norm in brand_lower:
+                            canonical_brand = brand_lower
                             break
                 # 5. Если вообще ничего — fallback
                 if not canonical_brand:
                     canonical_brand = brand_query_norm
 
-                handler = MessageHandler(self.db, self.user_manager, self.synonym_manager)
-                matches = self.db.cars_df[self.db.cars_df['brand'].str.lower() == canonical_brand]
-                if matches.empty:
-                    matches = self.db.cars_df[self.db.cars_df['brand'].str.lower().str.contains(canonical_brand)]
-                matches = matches.sort_values(by=["model"], ascending=True, kind="stable")
-                await handler.show_models_with_pagination(update, context, matches, canonical_brand, page, edit=True)
+                entries = self.db.get_brand_models(canonical_brand, partial=True)
+                await self.message_handler.show_models_with_pagination(
+                    update, context, entries, canonical_brand, page, edit=True
+                )
                 return
             # --- Патч brand_search_fixes: расширенная обработка single_ ---
             if data.startswith("model_"):
@@ -118,10 +197,13 @@ class CallbackHandler:
             elif data.startswith("page_"):
                 await self._handle_pagination(query, context)
         except Exception as e:
+            # Исключение не выходит за пределы таймера, поэтому ошибка учитывается здесь
+            metrics.inc("bot_callback_errors_total", prefix=callback_prefix(getattr(query, "data", None) or ""))
             logger.error(f"Ошибка при обработке кнопки: {str(e)}")
             log_user_action(user.id, user.username, "BUTTON_ERROR", getattr(query, "data", ""), str(e))
             try:
-                await query.edit_message_text(
+                await self._render(
+                    query,
                     text="😔 Произошла ошибка при получении информации. Попробуйте ещё раз✨"
                 )
             except Exception:
@@ -134,7 +216,8 @@ class CallbackHandler:
         type_id = query.data.replace("single_", "")
         store = self.user_manager.get_callback_data(type_id)
         if not store:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 text="⚠️ Не удалось найти информацию о выбранной щетке. Пожалуйста, начните поиск заново. /start"
             )
             return
@@ -147,29 +230,17 @@ class CallbackHandler:
             buttons.append([InlineKeyboardButton(f"⬅️ Левая ({pass_size} мм)", callback_data=f"single_right_{type_id}")])
         buttons.append([InlineKeyboardButton("🔙 Назад", callback_data=f"type_{type_id}")])
         buttons.append([InlineKeyboardButton("🔄 Новый поиск", callback_data="new_search")])
-        car_rows = self.db.cars_df[
-            (self.db.cars_df['brand'] == store.get('brand', '')) &
-            (self.db.cars_df['model'] == store.get('model', '')) &
-            (self.db.cars_df['years'] == store.get('years', ''))
-        ]
-        car_info = ""
-        if not car_rows.empty:
-            car_info = self.db.get_car_info(car_rows.iloc[0])
+        car_info = self.db.get_car_html(*self._car_key(store)) or ""
         frame = store.get('gy_frame', '')
         gy_type = store.get('gy_type', '')
-        type_desc = ""
-        if self.db.types_desc_df is not None:
-            type_rows = self.db.types_desc_df[self.db.types_desc_df['gy_type'] == gy_type]
-            if not type_rows.empty:
-                desc = type_rows.iloc[0].get('description', '')
-                if desc:
-                    type_desc = f"\n\n<i>{desc}</i>"
+        type_desc = self.db.get_type_description(gy_type)
         message = (
             f"{car_info}\n"
             f"<b>Выбран тип:</b> <i>{frame} {gy_type}</i>{type_desc}\n\n"
             f"<b>Выберите сторону для покупки одной щётки:</b>"
         )
-        await query.message.edit_text(
+        await self._render(
+            query,
             message,
             reply_markup=InlineKeyboardMarkup(buttons),
             parse_mode='HTML'
@@ -184,7 +255,8 @@ class CallbackHandler:
         type_id = data.replace("single_left_", "").replace("single_right_", "")
         store = self.user_manager.get_callback_data(type_id)
         if not store:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 text="⚠️ Не удалось найти информацию о выбранной щетке. Пожалуйста, начните поиск заново. /start"
             )
             return
@@ -194,26 +266,14 @@ class CallbackHandler:
         size = store.get('driver_size') if is_left else store.get('pass_size')
         side_name = "Правая" if is_left else "Левая"
         if not size:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 text=f"⚠️ Не удалось найти размер для {side_name.lower()} стороны. Пожалуйста, выберите другую сторону."
             )
             return
         ozon_url, wb_url = self.db.get_single_wiper_links(frame, gy_type, mount, size)
-        car_rows = self.db.cars_df[
-            (self.db.cars_df['brand'] == store.get('brand', '')) &
-            (self.db.cars_df['model'] == store.get('model', '')) &
-            (self.db.cars_df['years'] == store.get('years', ''))
-        ]
-        car_info = ""
-        if not car_rows.empty:
-            car_info = self.db.get_car_info(car_rows.iloc[0])
-        type_desc = ""
-        if self.db.types_desc_df is not None:
-            type_rows = self.db.types_desc_df[self.db.types_desc_df['gy_type'] == gy_type]
-            if not type_rows.empty:
-                desc = type_rows.iloc[0].get('description', '')
-                if desc:
-                    type_desc = f"\n\n<i>{desc}</i>"
+        car_info = self.db.get_car_html(*self._car_key(store)) or ""
+        type_desc = self.db.get_type_description(gy_type)
         message = (
             f"{car_info}\n"
             f"<b>Выбран тип:</b> <i>{frame} {gy_type}</i>{type_desc}\n\n"
@@ -227,7 +287,8 @@ class CallbackHandler:
             buttons.append([InlineKeyboardButton("🟣 Купить на Wildberries", url=wb_url)])
         buttons.append([InlineKeyboardButton("🔙 Назад", callback_data=f"single_{type_id}")])
         buttons.append([InlineKeyboardButton("🔄 Новый поиск", callback_data="new_search")])
-        await query.message.edit_text(
+        await self._render(
+            query,
             message,
             reply_markup=InlineKeyboardMarkup(buttons),
             parse_mode='HTML'
@@ -248,25 +309,22 @@ class CallbackHandler:
         store = self.user_manager.get_callback_data(model_id)
         
         if not store:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 text="⚠️ Нет подходящих щёток.\n /start"
             )
             return
         
-        car_rows = self.db.cars_df[
-            (self.db.cars_df['brand'] == store.get('brand', '')) &
-            (self.db.cars_df['model'] == store.get('model', '')) &
-            (self.db.cars_df['years'] == store.get('years', ''))
-        ]
+        car = self.db.get_car(*self._car_key(store))
         
-        if car_rows.empty:
-            await query.message.edit_text(
+        if car is None:
+            await self._render(
+                query,
                 text="⚠️ Нет подходящих щёток.\n /start"
             )
             return
         
-        car = car_rows.iloc[0]
-        car_info = self.db.get_car_info(car)
+        car_info = self.db.get_car_html(*self._car_key(store))
         
         mount = car['mount']
         driver_size = int(car['driver']) if str(car['driver']).isdigit() else None
@@ -276,27 +334,22 @@ class CallbackHandler:
         available_frames = self.db.get_available_frames(mount, [driver_size, pass_size])
         
         if available_frames.empty:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 car_info + "\n⚠️ К сожалению, для этого автомобиля нет подходящих щёток в нашем каталоге.",
                 parse_mode='HTML'
             )
             return
         
         # Создание кнопок для выбора типа корпуса
-        buttons = []
-        for _, rowf in available_frames.iterrows():
-            frame = rowf['gy_frame']
-            frame_id = self.user_manager.store_callback_data({
-                "brand": car['brand'],
-                "model": car['model'],
-                "years": car['years'],
-                "mount": mount,
-                "driver_size": driver_size,
-                "pass_size": pass_size,
-                "gy_frame": frame
-            })
-            btn = InlineKeyboardButton(str(frame), callback_data=f"frame_{frame_id}")
-            buttons.append([btn])
+        buttons = choice_rows(available_frames['gy_frame'].tolist(), "gy_frame", "frame_", {
+            "brand": car['brand'],
+            "model": car['model'],
+            "years": car['years'],
+            "mount": mount,
+            "driver_size": driver_size,
+            "pass_size": pass_size,
+        }, self.user_manager)
         
       
         
@@ -304,7 +357,8 @@ class CallbackHandler:
         # Добавление кнопки для нового поиска
         buttons.append([InlineKeyboardButton("🔄 Новый поиск", callback_data="new_search")])
         
-        await query.message.edit_text(
+        await self._render(
+            query,
             car_info + "\n<b>Выберите тип:</b>",
             reply_markup=InlineKeyboardMarkup(buttons),
             parse_mode='HTML'
@@ -322,7 +376,8 @@ class CallbackHandler:
         store = self.user_manager.get_callback_data(frame_id)
         
         if not store:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 text="⚠️ Не удалось найти информацию о выбранном корпусе. Пожалуйста, начните поиск заново. /start"
             )
             return
@@ -336,7 +391,8 @@ class CallbackHandler:
         available_types = self.db.get_available_types(frame, mount, [driver_size, pass_size])
         
         if available_types.empty:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 text="⚠️ Не удалось найти подходящие виды щеток для выбранного корпуса. Пожалуйста, выберите другой корпус."
             )
             return
@@ -351,11 +407,7 @@ class CallbackHandler:
             return
         
         # Создание кнопок для выбора вида щетки
-        buttons = []
-        for _, rowt in available_types.iterrows():
-            gy_type = rowt['gy_type']
-            type_id = self.user_manager.store_callback_data({**store, "gy_type": gy_type})
-            buttons.append([InlineKeyboardButton(str(gy_type), callback_data=f"type_{type_id}")])
+        buttons = choice_rows(available_types['gy_type'].tolist(), "gy_type", "type_", store, self.user_manager)
 
         # Кнопки "Назад" и "Новый поиск"
         back_to_frames_id = self.user_manager.store_callback_data({**store})
@@ -363,37 +415,30 @@ class CallbackHandler:
         buttons.append([InlineKeyboardButton("🔄 Новый поиск", callback_data="new_search")])
 
         # Получение информации об автомобиле
-        car_rows = self.db.cars_df[
-            (self.db.cars_df['brand'] == store.get('brand', '')) &
-            (self.db.cars_df['model'] == store.get('model', '')) &
-            (self.db.cars_df['years'] == store.get('years', ''))
-        ]
-
-        if car_rows.empty:
-            await query.message.edit_text(
+        car_info = self.db.get_car_html(*self._car_key(store))
+
+        if car_info is None:
+            await self._render(
+                query,
                 text="⚠️ Не удалось найти информацию о выбранной модели. Пожалуйста, начните поиск заново. /start"
             )
             return
 
-        car_info = self.db.get_car_info(car_rows.iloc[0])
         frame = store['gy_frame']
 
         # Формируем message только теперь!
         message = car_info + f"\n<b>Выберите вид щётки:</b>"
 
-        # Отправляем картинку корпуса (если нужна)
+        # Картинка корпуса (если есть) показывается в карточке вместе с текстом и кнопками
         img_dir = Config.WIPER_TYPES_IMG_DIR
         img_filename = f"{frame}.png"
         img_path = os.path.join(img_dir, img_filename)
-        if os.path.exists(img_path):
-            with open(img_path, "rb") as photo:
-                await query.message.reply_photo(photo=photo)
-
-        # Теперь точно отправляем текст с кнопками
-        await query.message.edit_text(
+        await self._render(
+            query,
             message,
             reply_markup=InlineKeyboardMarkup(buttons),
-            parse_mode='HTML'
+            parse_mode='HTML',
+            photo_path=img_path if await path_exists(img_path) else None
         )
     
     async def _handle_type_selection(self, query: Update.callback_query, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -408,7 +453,8 @@ class CallbackHandler:
         store = self.user_manager.get_callback_data(type_id)
         
         if not store:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 text="⚠️ Не удалось найти информацию о выбранном виде щетки. Пожалуйста, начните поиск заново. /start"
             )
             return
@@ -461,28 +507,17 @@ class CallbackHandler:
         buttons.append([InlineKeyboardButton("🔄 Новый поиск", callback_data="new_search")])
 
         # Получение информации об автомобиле
-        car_rows = self.db.cars_df[
-            (self.db.cars_df['brand'] == store.get('brand', '')) &
-            (self.db.cars_df['model'] == store.get('model', '')) &
-            (self.db.cars_df['years'] == store.get('years', ''))
-        ]
-        
-        if car_rows.empty:
-            await query.message.edit_text(
+        car_info = self.db.get_car_html(*self._car_key(store))
+        
+        if car_info is None:
+            await self._render(
+                query,
                 text="⚠️ Не удалось найти информацию о выбранной модели. Пожалуйста, начните поиск заново. /start"
             )
             return
         
-        car_info = self.db.get_car_info(car_rows.iloc[0])
-        
         # Получение описания типа щетки
-        type_desc = ""
-        if self.db.types_desc_df is not None:
-            type_rows = self.db.types_desc_df[self.db.types_desc_df['gy_type'] == gy_type]
-            if not type_rows.empty:
-                desc = type_rows.iloc[0].get('description', '')
-                if desc:
-                    type_desc = f"\n\n<i>{desc}</i>"
+        type_desc = self.db.get_type_description(gy_type)
         
         # Формирование сообщения
         message = (
@@ -491,31 +526,18 @@ class CallbackHandler:
             f"<b>Что вы хотите сделать?</b>"
         )
 
-        # ... всё что было ДО message ...
-        message = (
-            f"{car_info}\n"
-            f"<b>Выбран тип:</b> <i>{frame} {gy_type}</i>{type_desc}\n\n"
-            f"<b>Что вы хотите сделать?</b>"
-        )
-
         
         img_dir = Config.WIPER_TYPES_IMG_DIR
         img_filename = f"{gy_type}.png"
         img_path = os.path.join(img_dir, img_filename)
 
-        if os.path.exists(img_path):
-            # 1. Отправляем фото (без caption)
-            await context.bot.send_photo(
-                chat_id=query.message.chat_id,
-                photo=open(img_path, "rb")
-            )
-
-        # 2. Сразу после этого отправляем текст с кнопками (reply_markup)
-        await context.bot.send_message(
-            chat_id=query.message.chat_id,
-            text=message,
+        # Карточка: фото вида щетки с описанием и кнопками одним сообщением
+        await self._render(
+            query,
+            message,
             reply_markup=InlineKeyboardMarkup(buttons),
-            parse_mode='HTML'
+            parse_mode='HTML',
+            photo_path=img_path if await path_exists(img_path) else None
         )
     
     async def _handle_kit_selection(self, query: Update.callback_query, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -530,7 +552,8 @@ class CallbackHandler:
         store = self.user_manager.get_callback_data(type_id)
         
         if not store:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 text="⚠️ Не удалось найти информацию о выбранном комплекте. Пожалуйста, начните поиск заново. /start"
             )
             return
@@ -545,24 +568,10 @@ class CallbackHandler:
         ozon_kit_url, wb_kit_url = self.db.get_wiper_kit_links(frame, gy_type, mount, driver_size, pass_size)
         
         # Получение информации об автомобиле
-        car_rows = self.db.cars_df[
-            (self.db.cars_df['brand'] == store.get('brand', '')) &
-            (self.db.cars_df['model'] == store.get('model', '')) &
-            (self.db.cars_df['years'] == store.get('years', ''))
-        ]
-        
-        car_info = ""
-        if not car_rows.empty:
-            car_info = self.db.get_car_info(car_rows.iloc[0])
+        car_info = self.db.get_car_html(*self._car_key(store)) or ""
         
         # Получение описания типа щетки
-        type_desc = ""
-        if self.db.types_desc_df is not None:
-            type_rows = self.db.types_desc_df[self.db.types_desc_df['gy_type'] == gy_type]
-            if not type_rows.empty:
-                desc = type_rows.iloc[0].get('description', '')
-                if desc:
-                    type_desc = f"\n\n<i>{desc}</i>"
+        type_desc = self.db.get_type_description(gy_type)
         
         # Формирование сообщения
         message = (
@@ -583,7 +592,8 @@ class CallbackHandler:
         buttons.append([InlineKeyboardButton("🔙 Назад", callback_data=f"type_{type_id}")])
         buttons.append([InlineKeyboardButton("🔄 Новый поиск", callback_data="new_search")])
 
-        await query.message.edit_text(
+        await self._render(
+            query,
             message,
             reply_markup=InlineKeyboardMarkup(buttons),
             parse_mode='HTML'
@@ -601,7 +611,8 @@ class CallbackHandler:
             query: Объект callback-запроса
             context: Контекст обработчика
         """
-        await query.message.edit_text(
+        await self._render(
+            query,
             text="Введите марку автомобиля:"
         )
     
@@ -617,58 +628,51 @@ class CallbackHandler:
         store = self.user_manager.get_callback_data(back_id)
         
         if not store:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 text="⚠️ Не удалось вернуться к выбору корпуса. Пожалуйста, начните поиск заново. /start"
             )
             return
         
         # Получение информации об автомобиле
-        car_rows = self.db.cars_df[
-            (self.db.cars_df['brand'] == store.get('brand', '')) &
-            (self.db.cars_df['model'] == store.get('model', '')) &
-            (self.db.cars_df['years'] == store.get('years', ''))
-        ]
-        
-        if car_rows.empty:
-            await query.message.edit_text(
+        car = self.db.get_car(*self._car_key(store))
+        
+        if car is None:
+            await self._render(
+                query,
                 text="⚠️ Не удалось найти информацию о выбранной модели. Пожалуйста, начните поиск заново. /start"
             )
             return
         
-        car = car_rows.iloc[0]
+        car_info = self.db.get_car_html(*self._car_key(store))
         mount = car['mount']
         driver_size = int(car['driver']) if str(car['driver']).isdigit() else None
         pass_size = int(car['passanger']) if str(car['passanger']).isdigit() else None
-        car_info = self.db.get_car_info(car)
         
         # Получение доступных типов корпусов
         available_frames = self.db.get_available_frames(mount, [driver_size, pass_size])
         
         if available_frames.empty:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 car_info + "\n⚠️ К сожалению, для этого автомобиля нет подходящих щёток в нашем каталоге.",
                 parse_mode='HTML'
             )
             return
         
         # Создание кнопок для выбора типа корпуса
-        buttons = []
-        for _, rowf in available_frames.iterrows():
-            frame = rowf['gy_frame']
-            frame_id = self.user_manager.store_callback_data({
-                **store,
-                "mount": mount,
-                "driver_size": driver_size,
-                "pass_size": pass_size,
-                "gy_frame": frame
-            })
-            btn = InlineKeyboardButton(str(frame), callback_data=f"frame_{frame_id}")
-            buttons.append([btn])
+        buttons = choice_rows(available_frames['gy_frame'].tolist(), "gy_frame", "frame_", {
+            **store,
+            "mount": mount,
+            "driver_size": driver_size,
+            "pass_size": pass_size,
+        }, self.user_manager)
         
         # Добавление кнопки для нового поиска
         buttons.append([InlineKeyboardButton("🔄 Новый поиск", callback_data="new_search")])
         
-        await query.message.edit_text(
+        await self._render(
+            query,
             car_info + "\n<b>Выберите тип:</b>",
             reply_markup=InlineKeyboardMarkup(buttons),
             parse_mode='HTML'
@@ -686,7 +690,8 @@ class CallbackHandler:
         store = self.user_manager.get_callback_data(back_id)
         
         if not store:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 text="⚠️ Не удалось вернуться к выбору вида щетки. Пожалуйста, начните поиск заново. /start"
             )
             return
@@ -700,19 +705,14 @@ class CallbackHandler:
         available_types = self.db.get_available_types(frame, mount, [driver_size, pass_size])
         
         if available_types.empty:
-            await query.message.edit_text(
+            await self._render(
+                query,
                 text="⚠️ Не удалось найти подходящие виды щеток для выбранного корпуса. Пожалуйста, выберите другой корпус."
             )
             return
         
         # Создание кнопок для выбора вида щетки
-        buttons = []
-        for _, rowt in available_types.iterrows():
-            gy_type = rowt['gy_type']
-            type_id = self.user_manager.store_callback_data({
-                **store, "gy_type": gy_type
-            })
-            buttons.append([InlineKeyboardButton(str(gy_type), callback_data=f"type_{type_id}")])
+        buttons = choice_rows(available_types['gy_type'].tolist(), "gy_type", "type_", store, self.user_manager)
         
         # Добавление кнопки "Назад"
         back_to_frames_id = self.user_manager.store_callback_data({**store})
@@ -720,21 +720,18 @@ class CallbackHandler:
         buttons.append([InlineKeyboardButton("🔄 Новый поиск", callback_data="new_search")])
 
         # Получение информации об автомобиле
-        car_rows = self.db.cars_df[
-            (self.db.cars_df['brand'] == store.get('brand', '')) &
-            (self.db.cars_df['model'] == store.get('model', '')) &
-            (self.db.cars_df['years'] == store.get('years', ''))
-        ]
-        
-        if car_rows.empty:
-            await query.message.edit_text(
+        car_info = self.db.get_car_html(*self._car_key(store))
+        
+        if car_info is None:
+            await self._render(
+                query,
                 text="⚠️ Не удалось найти информацию о выбранной модели. Пожалуйста, начните поиск заново. /start"
             )
             return
         
-        car_info = self.db.get_car_info(car_rows.iloc[0])
         
-        await query.message.edit_text(
+        await self._render(
+            query,
             car_info + f"\n<b>Выберите вид щётки:</b>",
             reply_markup=InlineKeyboardMarkup(buttons),
             parse_mode='HTML'
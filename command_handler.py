@@ -10,7 +10,9 @@ from telegram.ext import ContextTypes
 
 from config import Config
 from utils.user_manager import UserManager
-from utils.logging_utils import log_user_action
+from utils.logging_utils import log_user_action, get_current_utc
+from utils.async_io import path_exists, append_text
+from utils.media_cache import MediaCache
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 MODELS_PER_PAGE = 100  # Можно вынести в Config
@@ -20,14 +22,16 @@ logger = logging.getLogger(__name__)
 class CommandHandler:
     """Класс для обработки команд бота."""
     
-    def __init__(self, user_manager: UserManager):
+    def __init__(self, user_manager: UserManager, media_cache: Optional[MediaCache] = None):
         """
         Инициализация обработчика команд.
         
         Args:
             user_manager: Менеджер пользователей
+            media_cache: Кэш file_id для медиафайлов
         """
         self.user_manager = user_manager
+        self.media_cache = media_cache or MediaCache()
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         """
@@ -44,9 +48,8 @@ class CommandHandler:
         try:
             # Проверка наличия видео
             video_path = os.path.join(Config.WIPER_TYPES_IMG_DIR, "gy_video.mp4")
-            if os.path.exists(video_path):
-                with open(video_path, "rb") as video:
-                    await update.message.reply_video(
+            if await path_exists(video_path):
+                await self.media_cache.send(video_path, lambda video: update.message.reply_video(
                         video=video,
                         caption="👋 <b>Привет!</b>\n\nЯ помогу подобрать подходящие щётки стеклоочистителя для вашего автомобиля.\n\n"
                                 "Напишите марку и следуйте моим инструкциям, например:\n"
@@ -55,7 +58,7 @@ class CommandHandler:
                                 "/help - Справка по использованию\n"
                                 ,
                         parse_mode='HTML'
-                    )
+                    ))
             else:
                 await update.message.reply_text(
                     f"👋 <b>Привет!</b>\n\nЯ помогу подобрать подходящие щётки стеклоочистителя для вашего автомобиля.\n\n"
@@ -272,12 +275,11 @@ class CommandHandler:
         
         # Сохранение отзыва в файл
         try:
-            os.makedirs(os.path.join(Config.LOGS_DIR, 'feedback'), exist_ok=True)
             feedback_file = os.path.join(Config.LOGS_DIR, 'feedback', f'feedback_{user.id}.txt')
-            
-            with open(feedback_file, 'a', encoding='utf-8') as f:
-                from utils.logging_utils import get_current_utc
-                f.write(f"[{get_current_utc()}] {user.id} ({user.username}): {feedback_text}\n")
+            await append_text(
+                feedback_file,
+                f"[{get_current_utc()}] {user.id} ({user.username}): {feedback_text}\n"
+            )
             
             await update.message.reply_text(
                 "✅ Спасибо за ваш отзыв! Мы обязательно учтем его при улучшении бота. /start"
@@ -2,23 +2,138 @@
 Модуль для работы с базой данных автомобилей и щеток.
 """
 import os
+import glob
+import hashlib
+import importlib
 import logging
+import pickle
+import threading
+import time
+import bisect
+import numpy as np
 import pandas as pd
-from typing import Dict, List, Optional, Tuple, Any, Set, Union
+from typing import Callable, Dict, List, Optional, Tuple, Any, Set, Union
 from config import Config
+from utils.file_watcher import FileWatcher
+from utils.fuzzy_search import FuzzySearchIndex
+from utils.normalization import normalize_text, normalize_series
+from utils.render_cache import RenderCache, RENDER_CACHE_MAX_SIZE
+from utils.metrics import timed
 
 logger = logging.getLogger(__name__)
 
+# Ключ автомобиля: (марка, модель, годы выпуска)
+CarKey = Tuple[Any, Any, Any]
+# Ключ комплекта: (корпус, вид, крепление, (меньший размер, больший размер))
+KitKey = Tuple[str, str, str, Tuple[int, int]]
+
+# Версия формата снимка каталога; увеличивается при изменении производных колонок
+SNAPSHOT_FORMAT_VERSION = 2
+# Модули, от кода которых зависят производные колонки снимка (нормализация, транслитерация, apply_schema);
+# их исходный текст входит в ключ снимка, поэтому после правки кода снимок пересобирается
+SNAPSHOT_CODE_MODULES = ('utils.normalization', 'utils.text_utils', __name__)
+
+# Типизированная схема таблиц: повторяющиеся подписи хранятся как категории, размеры — как Int64
+CARS_CATEGORY_COLUMNS = ['brand', 'model', 'mount']
+CARS_SIZE_COLUMNS = ['driver', 'passanger', 'rear']
+WIPERS_CATEGORY_COLUMNS = ['gy_frame', 'gy_type']
+WIPERS_SIZE_COLUMNS = ['size']
+# Значение, которым в каталоге обозначаются пропуски
+MISSING_VALUE = 'нет'
+# Суффикс колонки с исходной подписью нечислового размера ("Не указано", "-")
+SIZE_LABEL_SUFFIX = '_label'
+
+# Допустимое отклонение размера одной щетки от нужного, мм
+SIZE_TOLERANCE_MM = 10
+
+class Catalog:
+    """
+    Одна версия каталога: таблицы и построенные по ним индексы.
+    
+    После публикации в Database объект не изменяется, поэтому обработчики
+    могут читать его без блокировок, пока фоновый поток готовит следующую версию.
+    """
+    
+    def __init__(self, cars_df: Optional[pd.DataFrame] = None, wipers_df: Optional[pd.DataFrame] = None,
+                 types_desc_df: Optional[pd.DataFrame] = None):
+        """
+        Инициализация версии каталога.
+        
+        Args:
+            cars_df: База данных автомобилей
+            wipers_df: Каталог щеток
+            types_desc_df: Описания типов щеток
+        """
+        self.cars_df = cars_df
+        self.wipers_df = wipers_df
+        self.types_desc_df = types_desc_df
+        self.version = 0
+        # Марки в нижнем регистре -> написание в каталоге
+        self.brands: Dict[str, str] = {}
+        # Марка в нижнем регистре -> уникальные автомобили, отсортированные по модели
+        self.brand_models: Dict[str, List[CarKey]] = {}
+        # (марка, модель, годы) -> позиция первой строки в cars_df
+        self.car_index: Dict[CarKey, int] = {}
+        # Префиксный индекс для inline-запросов: отсортированные ключи "марка модель" и "модель"
+        # и параллельный список позиций строк
+        self.prefix_keys: List[str] = []
+        self.prefix_rows: List[int] = []
+        # Позиция строки -> (заголовок, размеры и крепление) для результатов inline-запросов
+        self.car_summaries: Dict[int, Tuple[str, str]] = {}
+        self.fuzzy_index: Optional[FuzzySearchIndex] = None
+        self.source_mtimes: Dict[str, float] = {}
+        self.load_duration = 0.0
+        # Индексы совместимости: (крепление, размер) -> корпус -> вид -> записи каталога
+        self.compat_index: Dict[Tuple[str, int], Dict[str, Dict[str, List[Dict[str, Any]]]]] = {}
+        # Индекс комплектов: (корпус, вид, крепление, пара размеров) -> (Ozon, Wildberries) первой строки
+        self.kit_index: Dict[KitKey, Tuple[Any, Any]] = {}
+        # Индекс размеров: (корпус, вид) -> (отсортированные размеры, ссылки (Ozon, Wildberries) для каждого размера)
+        self.size_index: Dict[Tuple[Any, Any], Tuple[np.ndarray, List[Tuple[Any, Any]]]] = {}
+
 class Database:
     """Класс для работы с базами данных автомобилей и щеток."""
     
-    def __init__(self):
-        """Инициализация баз данных."""
-        self.cars_df = None
-        self.wipers_df = None
-        self.types_desc_df = None
+    def __init__(self, reload_interval: Optional[int] = None):
+        """
+        Инициализация баз данных.
+        
+        Args:
+            reload_interval: Интервал опроса xlsx-файлов в секундах, если inotify недоступен; None — без перезагрузки
+        """
+        self._catalog = Catalog()
+        self._reload_lock = threading.Lock()
+        # Наблюдатели файлов вызывают проверку одновременно, если заменено несколько xlsx сразу
+        self._check_lock = threading.Lock()
+        self._reload_listeners: List[Callable[[Catalog], None]] = []
+        self._watchers: List[FileWatcher] = []
+        self.reload_interval = reload_interval
+        self.reload_count = 0
+        self.last_reload_error: Optional[str] = None
+        self.render_cache = RenderCache(getattr(Config, 'RENDER_CACHE_SIZE', RENDER_CACHE_MAX_SIZE))
         self.load_all()
     
+    @property
+    def catalog(self) -> Catalog:
+        """Текущая версия каталога."""
+        return self._catalog
+    
+    @property
+    def version(self) -> int:
+        """Номер текущей версии каталога."""
+        return self._catalog.version
+    
+    @property
+    def cars_df(self) -> Optional[pd.DataFrame]:
+        return self._catalog.cars_df
+    
+    @property
+    def wipers_df(self) -> Optional[pd.DataFrame]:
+        return self._catalog.wipers_df
+    
+    @property
+    def types_desc_df(self) -> Optional[pd.DataFrame]:
+        return self._catalog.types_desc_df
+    
     def load_all(self) -> bool:
         """
         Загружает все базы данных.
@@ -27,54 +142,669 @@ class Database:
             bool: True, если все базы данных загружены успешно
         """
         try:
-            self.load_cars_database()
-            self.load_wipers_catalog()
-            self.load_types_desc()
+            self._catalog = self._build_catalog(self._catalog.version + 1)
             return True
         except Exception as e:
             logger.error(f"Ошибка при загрузке баз данных: {str(e)}")
             return False
     
-    def load_cars_database(self) -> None:
-        """Загружает базу данных автомобилей."""
+    def _build_catalog(self, version: int) -> Catalog:
+        """
+        Читает исходные файлы и строит новую версию каталога, не трогая текущую.
+        
+        Args:
+            version: Номер новой версии
+            
+        Returns:
+            Catalog: Полностью построенный каталог
+        """
+        started = time.perf_counter()
+        mtimes = self._source_mtimes()
+        catalog = self.load_snapshot()
+        if catalog is None:
+            catalog = Catalog(self.load_cars_database(), self.load_wipers_catalog(), self.load_types_desc())
+            self.save_snapshot(catalog)
+        self.build_indexes(catalog)
+        if catalog.cars_df is not None:
+            catalog.brands = {str(brand).strip().lower(): brand for brand in catalog.cars_df['brand'].unique()}
+            catalog.brand_models = self._build_brand_models(catalog.cars_df)
+            catalog.car_index = self._build_car_index(catalog.cars_df)
+            catalog.prefix_keys, catalog.prefix_rows, catalog.car_summaries = self._build_prefix_index(
+                catalog.cars_df, catalog.car_index
+            )
+            catalog.fuzzy_index = FuzzySearchIndex(enumerate(catalog.cars_df['full_name'].tolist()))
+        catalog.version = version
+        catalog.source_mtimes = mtimes
+        catalog.load_duration = time.perf_counter() - started
+        return catalog
+    
+    def reload(self) -> bool:
+        """
+        Перечитывает каталог и атомарно подменяет текущую версию.
+        
+        Returns:
+            bool: True, если новая версия опубликована
+        """
+        with self._reload_lock:
+            try:
+                catalog = self._build_catalog(self._catalog.version + 1)
+            except Exception as e:
+                self.last_reload_error = str(e)
+                logger.error(f"Ошибка при перезагрузке каталога, остается версия {self._catalog.version}: {e}")
+                return False
+            self._catalog = catalog
+            self.reload_count += 1
+            self.last_reload_error = None
+        for listener in self._reload_listeners:
+            try:
+                listener(catalog)
+            except Exception as e:
+                logger.error(f"Ошибка в обработчике перезагрузки каталога: {e}")
+        logger.info(f"Каталог перезагружен: версия {catalog.version}, {catalog.load_duration:.2f} с, "
+                    f"{len(catalog.cars_df)} автомобилей, {len(catalog.wipers_df)} щеток, "
+                    f"{len(catalog.types_desc_df)} описаний")
+        return True
+    
+    @staticmethod
+    def _build_brand_models(cars_df: pd.DataFrame) -> Dict[str, List[CarKey]]:
+        """
+        Группирует автомобили по маркам для постраничного вывода.
+        
+        Args:
+            cars_df: База данных автомобилей
+            
+        Returns:
+            Dict[str, List[CarKey]]: Марка в нижнем регистре -> уникальные (марка, модель, годы) по возрастанию модели
+        """
+        ordered = cars_df.sort_values(by=["model"], ascending=True, kind="stable")
+        brand_models: Dict[str, Dict[CarKey, None]] = {}
+        for key in zip(ordered['brand'].tolist(), ordered['model'].tolist(), ordered['years'].tolist()):
+            brand_models.setdefault(str(key[0]).strip().lower(), {})[key] = None
+        return {brand: list(keys) for brand, keys in brand_models.items()}
+    
+    @staticmethod
+    def _build_car_index(cars_df: pd.DataFrame) -> Dict[CarKey, int]:
+        """
+        Строит индекс строк автомобилей по ключу (марка, модель, годы).
+        
+        Args:
+            cars_df: База данных автомобилей
+            
+        Returns:
+            Dict[CarKey, int]: Ключ -> позиция первой подходящей строки
+        """
+        car_index: Dict[CarKey, int] = {}
+        keys = zip(cars_df['brand'].tolist(), cars_df['model'].tolist(), cars_df['years'].tolist())
+        for pos, key in enumerate(keys):
+            car_index.setdefault(key, pos)
+        return car_index
+    
+    @timed("bot_db_seconds", "method")
+    def get_car(self, brand: Any, model: Any, years: Any) -> Optional[pd.Series]:
+        """
+        Получает строку автомобиля по ключу.
+        
+        Args:
+            brand: Марка
+            model: Модель
+            years: Годы выпуска
+            
+        Returns:
+            Optional[pd.Series]: Строка cars_df или None, если автомобиль не найден
+        """
+        catalog = self._catalog
+        pos = catalog.car_index.get((brand, model, years))
+        if pos is None:
+            return None
+        return catalog.cars_df.iloc[pos]
+    
+    @timed("bot_db_seconds", "method")
+    def get_car_html(self, brand: Any, model: Any, years: Any) -> Optional[str]:
+        """
+        Получает отформатированную информацию об автомобиле по ключу.
+        
+        Результат get_car_info кэшируется по версии каталога и позиции строки.
+        
+        Args:
+            brand: Марка
+            model: Модель
+            years: Годы выпуска
+            
+        Returns:
+            Optional[str]: HTML-заголовок или None, если автомобиль не найден
+        """
+        catalog = self._catalog
+        pos = catalog.car_index.get((brand, model, years))
+        if pos is None:
+            return None
+        return self.render_cache.get_or_render(
+            catalog.version, 'car', pos, lambda: self.get_car_info(catalog.cars_df.iloc[pos])
+        )
+    
+    @timed("bot_db_seconds", "method")
+    def get_type_description(self, gy_type: str) -> str:
+        """
+        Получает блок описания вида щетки для сообщения.
+        
+        Args:
+            gy_type: Вид щетки
+            
+        Returns:
+            str: HTML-блок с описанием или пустая строка, если описания нет
+        """
+        catalog = self._catalog
+        return self.render_cache.get_or_render(
+            catalog.version, 'type', gy_type, lambda: self._render_type_description(catalog.types_desc_df, gy_type)
+        )
+    
+    @staticmethod
+    def _render_type_description(types_desc_df: Optional[pd.DataFrame], gy_type: str) -> str:
+        """Формирует блок описания вида щетки."""
+        if types_desc_df is None:
+            return ""
+        type_rows = types_desc_df[types_desc_df['gy_type'] == gy_type]
+        if type_rows.empty:
+            return ""
+        desc = type_rows.iloc[0].get('description', '')
+        if not desc:
+            return ""
+        return f"\n\n<i>{desc}</i>"
+    
+    def get_render_stats(self) -> Dict[str, Any]:
+        """
+        Получает метрики кэша отрисованных фрагментов.
+        
+        Returns:
+            Dict[str, Any]: Размер кэша, счетчики и доля попаданий
+        """
+        return self.render_cache.get_stats()
+    
+    @staticmethod
+    def _size_label(value: Any, label: Any) -> Any:
+        """
+        Возвращает размер для отображения: число, исходную подпись ("Не указано") или "нет".
+        
+        Args:
+            value: Значение колонки размера
+            label: Значение колонки <размер>_label
+        """
+        if not pd.isna(value):
+            return value
+        return MISSING_VALUE if label is None or pd.isna(label) else label
+    
+    def _build_prefix_index(self, cars_df: pd.DataFrame, car_index: Dict[CarKey, int]
+                            ) -> Tuple[List[str], List[int], Dict[int, Tuple[str, str]]]:
+        """
+        Строит префиксный индекс и краткие описания автомобилей для inline-запросов.
+        
+        Каждый уникальный автомобиль индексируется по нормализованным "марка модель" и "модель".
+        
+        Args:
+            cars_df: База данных автомобилей
+            car_index: Индекс уникальных автомобилей
+            
+        Returns:
+            Tuple: Отсортированные ключи, позиции строк для ключей и описания по позициям
+        """
+        from utils.formatting import format_wiper_info
+        
+        def column(name: str) -> List[Any]:
+            return cars_df[name].tolist() if name in cars_df.columns else [None] * len(cars_df)
+        
+        brands, models, years, mounts = column('brand'), column('model'), column('years'), column('mount')
+        full_names, model_names = column('full_name'), column('model_lower')
+        drivers, driver_labels = column('driver'), column(f"driver{SIZE_LABEL_SUFFIX}")
+        passengers, passenger_labels = column('passanger'), column(f"passanger{SIZE_LABEL_SUFFIX}")
+        
+        entries: List[Tuple[str, int]] = []
+        summaries: Dict[int, Tuple[str, str]] = {}
+        for pos in car_index.values():
+            entries.append((full_names[pos], pos))
+            entries.append((model_names[pos], pos))
+            title = f"{str(brands[pos]).title()} {str(models[pos]).upper()} ({years[pos]})"
+            driver = format_wiper_info(self._size_label(drivers[pos], driver_labels[pos]))
+            passenger = format_wiper_info(self._size_label(passengers[pos], passenger_labels[pos]))
+            summaries[pos] = (title, f"➡️ {driver} · ⬅️ {passenger} · {mounts[pos]}")
+        entries.sort()
+        return [key for key, _ in entries], [pos for _, pos in entries], summaries
+    
+    @timed("bot_db_seconds", "method")
+    def search_prefix(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[List[Dict[str, str]], Optional[int]]:
+        """
+        Ищет автомобили, у которых "марка модель" или "модель" начинается с запроса.
+        
+        Используется для inline-запросов: поиск идет по отсортированному списку ключей
+        двоичным поиском, а текст карточки берется из кэша отрисовки.
+        
+        Args:
+            query: Текст запроса
+            offset: Сколько результатов пропустить
+            limit: Максимальное количество результатов
+            
+        Returns:
+            Tuple: Результаты (id, title, description, html) и смещение следующей страницы или None
+        """
+        catalog = self._catalog
+        prefix = " ".join(normalize_text(query).split())
+        if not prefix or catalog.cars_df is None:
+            return [], None
+        keys, rows = catalog.prefix_keys, catalog.prefix_rows
+        seen: Set[int] = set()
+        positions: List[int] = []
+        has_more = False
+        for i in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            pos = rows[i]
+            if pos in seen:
+                continue
+            seen.add(pos)
+            if len(seen) <= offset:
+                continue
+            if len(positions) == limit:
+                has_more = True
+                break
+            positions.append(pos)
+        
+        results = []
+        for pos in positions:
+            title, description = catalog.car_summaries[pos]
+            html = self.render_cache.get_or_render(
+                catalog.version, 'car', pos, lambda: self.get_car_info(catalog.cars_df.iloc[pos])
+            )
+            results.append({'id': f"{catalog.version}:{pos}", 'title': title, 'description': description, 'html': html})
+        return results, (offset + len(positions) if has_more else None)
+    
+    @timed("bot_db_seconds", "method")
+    def get_brand_models(self, brand: str, partial: bool = False) -> List[CarKey]:
+        """
+        Получает отсортированный список автомобилей марки.
+        
+        Args:
+            brand: Марка (в любом регистре)
+            partial: Искать также марки, содержащие строку
+            
+        Returns:
+            List[CarKey]: Кортежи (марка, модель, годы) по возрастанию модели
+        """
+        brand_models = self._catalog.brand_models
+        brand = str(brand).strip().lower()
+        if not partial or brand in brand_models:
+            return brand_models.get(brand, [])
+        matched = [entries for name, entries in brand_models.items() if brand in name]
+        if len(matched) <= 1:
+            return matched[0] if matched else []
+        return sorted((entry for entries in matched for entry in entries), key=lambda entry: entry[1])
+    
+    def add_reload_listener(self, listener: Callable[[Catalog], None]) -> None:
+        """
+        Регистрирует функцию, вызываемую после публикации новой версии каталога.
+        
+        Args:
+            listener: Функция, принимающая новый каталог
+        """
+        self._reload_listeners.append(listener)
+    
+    def _source_mtimes(self) -> Dict[str, float]:
+        """Возвращает время изменения исходных xlsx-файлов."""
+        return {path: os.path.getmtime(path) for path in self._source_paths() if os.path.exists(path)}
+    
+    def check_for_updates(self) -> bool:
+        """
+        Перезагружает каталог, если исходные файлы изменились.
+        
+        Returns:
+            bool: True, если каталог был перезагружен
+        """
+        with self._check_lock:
+            if self._source_mtimes() == self._catalog.source_mtimes:
+                return False
+            return self.reload()
+    
+    async def start(self) -> None:
+        """Запускает отслеживание изменений xlsx-файлов каталога в цикле событий приложения."""
+        if not self.reload_interval or self._watchers:
+            return
+        for path in self._source_paths():
+            watcher = FileWatcher(path, self.check_for_updates, self.reload_interval)
+            await watcher.start()
+            self._watchers.append(watcher)
+    
+    async def stop(self) -> None:
+        """Останавливает отслеживание изменений xlsx-файлов каталога."""
+        watchers, self._watchers = self._watchers, []
+        for watcher in watchers:
+            await watcher.stop()
+    
+    def get_reload_stats(self) -> Dict[str, Any]:
+        """
+        Получает сведения о текущей версии каталога.
+        
+        Returns:
+            Dict[str, Any]: Версия, длительность загрузки, число строк и счетчики перезагрузок
+        """
+        catalog = self._catalog
+        return {
+            'version': catalog.version,
+            'load_duration': catalog.load_duration,
+            'cars_rows': len(catalog.cars_df) if catalog.cars_df is not None else 0,
+            'wipers_rows': len(catalog.wipers_df) if catalog.wipers_df is not None else 0,
+            'types_rows': len(catalog.types_desc_df) if catalog.types_desc_df is not None else 0,
+            'reload_count': self.reload_count,
+            'last_reload_error': self.last_reload_error,
+        }
+    
+    @staticmethod
+    def _source_paths() -> List[str]:
+        """Возвращает пути к исходным xlsx-файлам каталога."""
+        return [Config.DATABASE_PATH, Config.WIPERS_PATH, Config.TYPES_DESC_PATH]
+    
+    def _snapshot_path(self) -> str:
+        """
+        Вычисляет путь к снимку каталога по хешу исходных файлов и кода, который строит производные колонки.
+        
+        Returns:
+            str: Путь к файлу снимка
+        """
+        digest = hashlib.sha256(f"v{SNAPSHOT_FORMAT_VERSION}".encode())
+        code_paths = [importlib.import_module(name).__file__ for name in SNAPSHOT_CODE_MODULES]
+        for path in code_paths + self._source_paths():
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        cache_dir = getattr(Config, 'CACHE_DIR', 'cache')
+        return os.path.join(cache_dir, f"catalog_{digest.hexdigest()[:16]}.pkl")
+    
+    def load_snapshot(self) -> Optional[Catalog]:
+        """
+        Загружает каталог из снимка, если исходные файлы и код нормализации не менялись.
+        
+        Returns:
+            Optional[Catalog]: Каталог без индексов или None, если снимка нет
+        """
+        try:
+            path = self._snapshot_path()
+            if not os.path.exists(path):
+                return None
+            started = time.perf_counter()
+            with open(path, 'rb') as f:
+                snapshot = pickle.load(f)
+            catalog = Catalog(snapshot['cars_df'], snapshot['wipers_df'], snapshot['types_desc_df'])
+            logger.info(f"Каталог загружен из снимка {path} за {(time.perf_counter() - started) * 1000:.1f} мс: "
+                        f"{len(catalog.cars_df)} автомобилей, {len(catalog.wipers_df)} щеток")
+            return catalog
+        except Exception as e:
+            logger.warning(f"Не удалось загрузить снимок каталога, читаем xlsx: {e}")
+            return None
+    
+    def save_snapshot(self, catalog: Catalog) -> None:
+        """
+        Сохраняет разобранный каталог в снимок и удаляет устаревшие снимки.
+        
+        Args:
+            catalog: Каталог, прочитанный из xlsx
+        """
         try:
-            df = pd.read_excel(Config.DATABASE_PATH, sheet_name=0, engine='openpyxl').fillna('нет')
+            path = self._snapshot_path()
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump({
+                    'cars_df': catalog.cars_df,
+                    'wipers_df': catalog.wipers_df,
+                    'types_desc_df': catalog.types_desc_df,
+                }, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            for stale in glob.glob(os.path.join(os.path.dirname(path) or '.', 'catalog_*.pkl')):
+                if stale != path:
+                    os.remove(stale)
+            logger.info(f"Снимок каталога сохранен: {path}")
+        except Exception as e:
+            logger.warning(f"Не удалось сохранить снимок каталога: {e}")
+    
+    def load_cars_database(self) -> pd.DataFrame:
+        """
+        Загружает базу данных автомобилей.
+        
+        Returns:
+            pd.DataFrame: Нормализованная база данных автомобилей
+        """
+        try:
+            df = pd.read_excel(Config.DATABASE_PATH, sheet_name=0, engine='openpyxl')
             if not self.validate_database(df):
                 raise ValueError("Ошибка валидации базы данных автомобилей")
+            df = self.apply_schema(df, CARS_CATEGORY_COLUMNS, CARS_SIZE_COLUMNS)
             
             # Нормализация данных
-            df['brand_lower'] = df['brand'].apply(self.normalize_text)
-            df['model_lower'] = df['model'].apply(self.normalize_text)
+            df['brand_lower'] = normalize_series(df['brand'])
+            df['model_lower'] = normalize_series(df['model'])
             df['full_name'] = df['brand_lower'] + ' ' + df['model_lower']
             
-            self.cars_df = df
             logger.info(f"База данных автомобилей загружена успешно: {len(df)} записей")
+            return df
         except Exception as e:
             logger.error(f"Ошибка при загрузке базы данных автомобилей: {str(e)}")
             raise
     
-    def load_wipers_catalog(self) -> None:
-        """Загружает каталог щеток."""
+    def load_wipers_catalog(self) -> pd.DataFrame:
+        """
+        Загружает каталог щеток.
+        
+        Returns:
+            pd.DataFrame: Каталог щеток
+        """
         try:
-            wipers = pd.read_excel(Config.WIPERS_PATH, sheet_name=0, engine='openpyxl').fillna('нет')
+            wipers = pd.read_excel(Config.WIPERS_PATH, sheet_name=0, engine='openpyxl')
             wipers.columns = [col.strip() for col in wipers.columns]
-            self.wipers_df = wipers
+            wipers = self.apply_schema(wipers, WIPERS_CATEGORY_COLUMNS, WIPERS_SIZE_COLUMNS, mount_flags=True)
             logger.info(f"Каталог щеток загружен успешно: {len(wipers)} записей")
+            return wipers
         except Exception as e:
             logger.error(f"Ошибка при загрузке каталога щеток: {str(e)}")
             raise
     
-    def load_types_desc(self) -> None:
-        """Загружает описания типов щеток."""
+    @staticmethod
+    def apply_schema(df: pd.DataFrame, category_columns: List[str], size_columns: List[str],
+                     mount_flags: bool = False) -> pd.DataFrame:
+        """
+        Приводит загруженную таблицу к компактным типам.
+        
+        Размеры становятся Int64 с пропусками вместо "нет", а нечисловые подписи размеров
+        сохраняются в категориальной колонке с суффиксом SIZE_LABEL_SUFFIX. Повторяющиеся
+        подписи становятся категориями, колонки креплений с отметками "да" — булевыми.
+        Остальные пропуски заполняются "нет".
+        
+        Args:
+            df: Таблица, прочитанная из xlsx
+            category_columns: Колонки с повторяющимися подписями
+            size_columns: Колонки с размерами в мм
+            mount_flags: Преобразовать колонки с отметками "да" в булевы
+            
+        Returns:
+            pd.DataFrame: Таблица с типизированными колонками
+        """
+        df = df.copy()
+        for col in size_columns:
+            if col in df.columns:
+                sizes = pd.to_numeric(df[col], errors='coerce')
+                sizes = sizes.where(sizes % 1 == 0)
+                labels = df[col].where(sizes.isna() & df[col].notna())
+                if labels.notna().any():
+                    df[f"{col}{SIZE_LABEL_SUFFIX}"] = labels.astype(str).where(labels.notna()).astype('category')
+                df[col] = sizes.astype('Int64')
+        if mount_flags:
+            for col in df.columns:
+                if col in size_columns or col in category_columns:
+                    continue
+                marks = df[col].astype(str).str.strip().str.lower() == "да"
+                if marks.any():
+                    df[col] = marks.astype(bool)
+        typed = set(size_columns) | set(category_columns) | {f"{col}{SIZE_LABEL_SUFFIX}" for col in size_columns}
+        other = [col for col in df.columns if col not in typed and df[col].dtype != bool]
+        df[other] = df[other].fillna(MISSING_VALUE)
+        for col in category_columns:
+            if col in df.columns:
+                df[col] = df[col].fillna(MISSING_VALUE).astype(str).astype('category')
+        return df
+    
+    def load_types_desc(self) -> pd.DataFrame:
+        """
+        Загружает описания типов щеток.
+        
+        Returns:
+            pd.DataFrame: Описания типов щеток
+        """
         try:
             df = pd.read_excel(Config.TYPES_DESC_PATH, sheet_name=0, engine='openpyxl').fillna('')
             df.columns = [col.strip() for col in df.columns]
-            self.types_desc_df = df
             logger.info(f"Описания типов щеток загружены успешно: {len(df)} записей")
+            return df
         except Exception as e:
             logger.error(f"Ошибка при загрузке описаний типов щеток: {str(e)}")
             raise
     
+    def build_indexes(self, catalog: Catalog) -> None:
+        """
+        Строит индексы совместимости и комплектов по каталогу щеток.
+        
+        Args:
+            catalog: Каталог, в который записываются индексы
+        """
+        compat_index: Dict[Tuple[str, int], Dict[str, Dict[str, List[Dict[str, Any]]]]] = {}
+        kit_index: Dict[KitKey, Tuple[Any, Any]] = {}
+        if catalog.wipers_df is None:
+            catalog.compat_index, catalog.kit_index = compat_index, kit_index
+            catalog.size_index = {}
+            return
+        
+        df = catalog.wipers_df
+        # Колонки креплений — булевы колонки, полученные из отметок "да"
+        mount_columns = [col for col in df.columns if df[col].dtype == bool]
+        mount_flags = {col: df[col].tolist() for col in mount_columns}
+        
+        def column(name: str) -> List[Any]:
+            return df[name].tolist() if name in df.columns else [None] * len(df)
+        
+        frames, types = column('gy_frame'), column('gy_type')
+        frame_pics, type_pics = column('gy_frame_pic'), column('gy_type_pic')
+        sizes, articles, kits = column('size'), column('article'), column('Комплект')
+        ozon, wb = column('Ozon'), column('Wildberries')
+        
+        for pos in range(len(df)):
+            mounts = [col for col in mount_columns if mount_flags[col][pos]]
+            if not mounts:
+                continue
+            record = {
+                'row': pos,
+                'gy_frame': frames[pos],
+                'gy_frame_pic': frame_pics[pos],
+                'gy_type': types[pos],
+                'gy_type_pic': type_pics[pos],
+                'article': articles[pos],
+                'Ozon': ozon[pos],
+                'Wildberries': wb[pos],
+            }
+            size = self._size_key(sizes[pos])
+            kit_sizes = self._parse_kit(kits[pos])
+            for mount in mounts:
+                if size is not None:
+                    by_frame = compat_index.setdefault((mount, size), {})
+                    by_frame.setdefault(frames[pos], {}).setdefault(types[pos], []).append(record)
+                if kit_sizes:
+                    key = (str(frames[pos]).strip(), str(types[pos]).strip(), mount, kit_sizes)
+                    kit_index.setdefault(key, (ozon[pos], wb[pos]))
+        
+        catalog.compat_index, catalog.kit_index = compat_index, kit_index
+        catalog.size_index = self._build_size_index(df)
+        logger.info(f"Индексы каталога щеток построены: {len(compat_index)} ключей совместимости, "
+                    f"{len(kit_index)} ключей комплектов, {len(catalog.size_index)} ключей размеров")
+    
+    def _build_size_index(self, df: pd.DataFrame) -> Dict[Tuple[Any, Any], Tuple[np.ndarray, List[Tuple[Any, Any]]]]:
+        """
+        Строит для каждой пары (корпус, вид) отсортированный массив размеров и ссылки на каждый размер.
+        
+        Ссылки берутся из первых строк каталога, где они заполнены, как при поиске по маске.
+        
+        Args:
+            df: Каталог щеток
+            
+        Returns:
+            Dict: (корпус, вид) -> (массив размеров, список пар (Ozon, Wildberries))
+        """
+        def column(name: str) -> List[Any]:
+            return df[name].tolist() if name in df.columns else [None] * len(df)
+        
+        frames, types, sizes = column('gy_frame'), column('gy_type'), column('size')
+        ozon_columns = [column(name) for name in ('ozon_url', 'Ozon')]
+        wb_columns = [column(name) for name in ('wb_url', 'Wildberries')]
+        
+        links: Dict[Tuple[Any, Any], Dict[int, List[Any]]] = {}
+        for pos in range(len(df)):
+            size = self._size_key(sizes[pos])
+            if size is None:
+                continue
+            found = links.setdefault((frames[pos], types[pos]), {}).setdefault(size, [None, None])
+            for i, link_columns in enumerate((ozon_columns, wb_columns)):
+                for values in link_columns:
+                    if pd.notna(values[pos]) and not found[i]:
+                        found[i] = values[pos]
+        
+        size_index = {}
+        for key, by_size in links.items():
+            ordered = sorted(by_size)
+            size_index[key] = (np.array(ordered, dtype=np.int64), [tuple(by_size[size]) for size in ordered])
+        return size_index
+    
+    @staticmethod
+    def _parse_kit(kit: Any) -> Optional[Tuple[int, int]]:
+        """
+        Разбирает колонку "Комплект" вида "650/400 мм" в упорядоченную пару размеров.
+        
+        Args:
+            kit: Значение колонки
+            
+        Returns:
+            Optional[Tuple[int, int]]: (меньший размер, больший размер) или None, если комплекта нет
+        """
+        if kit is None or pd.isna(kit) or str(kit).lower() == "нет":
+            return None
+        parts = str(kit).replace(" ", "").replace("мм", "").strip().split("/")
+        if len(parts) != 2 or not (parts[0].isdigit() and parts[1].isdigit()):
+            return None
+        size_a, size_b = int(parts[0]), int(parts[1])
+        return (size_a, size_b) if size_a <= size_b else (size_b, size_a)
+    
+    @staticmethod
+    def _size_key(size: Any) -> Optional[int]:
+        """
+        Приводит размер щетки к целому числу для ключей индекса.
+        
+        Args:
+            size: Размер из каталога или из карточки автомобиля
+            
+        Returns:
+            Optional[int]: Размер в мм или None, если размер не указан
+        """
+        if size is None or isinstance(size, bool):
+            return None
+        if isinstance(size, (int, float)):
+            return int(size) if not pd.isna(size) and float(size).is_integer() else None
+        size_str = str(size).strip()
+        return int(size_str) if size_str.isdigit() else None
+    
+    def _lookup_compat(self, mount: str, sizes: List[int]) -> List[Dict[str, Dict[str, List[Dict[str, Any]]]]]:
+        """Возвращает ветки индекса совместимости для крепления и списка размеров."""
+        compat_index = self._catalog.compat_index
+        buckets = []
+        for size in sizes:
+            size_key = self._size_key(size)
+            if size_key is None:
+                continue
+            bucket = compat_index.get((mount, size_key))
+            if bucket:
+                buckets.append(bucket)
+        return buckets
+    
     @staticmethod
     def validate_database(df: pd.DataFrame) -> bool:
         """
@@ -104,13 +834,7 @@ class Database:
         Returns:
             str: Нормализованный текст
         """
-        import re
-        from utils.text_utils import translit_ru_to_en
-        
-        s = str(s).strip().lower().replace('ё', 'е')
-        if re.search(r'[а-я]', s):
-            s = translit_ru_to_en(s)
-        return s
+        return normalize_text(s)
     
     def get_car_info(self, row: pd.Series) -> str:
         """
@@ -124,14 +848,36 @@ class Database:
         """
         from utils.formatting import format_wiper_info
         
+        def size(name: str) -> Any:
+            return self._size_label(row.get(name, ''), row.get(f"{name}{SIZE_LABEL_SUFFIX}"))
+        
         return (
             f"🚗 <b>{str(row.get('brand', '')).title()} {str(row.get('model', '')).upper()}</b> <i>({row.get('years', '')})</i>\n"
             f"🔗 <b>Крепление:</b> <i>{row.get('mount', '')}</i>\n"
-            f"➡️ <b>Правая щётка:</b> <code>{format_wiper_info(row.get('driver', ''))}</code>\n"
-            f"⬅️ <b>Левая щётка:</b> <code>{format_wiper_info(row.get('passanger', ''))}</code>\n"
+            f"➡️ <b>Правая щётка:</b> <code>{format_wiper_info(size('driver'))}</code>\n"
+            f"⬅️ <b>Левая щётка:</b> <code>{format_wiper_info(size('passanger'))}</code>\n"
             "——————\n"
         )
     
+    @timed("bot_db_seconds", "method")
+    def fuzzy_search(self, query: str, limit: int = 10) -> pd.DataFrame:
+        """
+        Ищет автомобили с учетом опечаток в марке и модели.
+        
+        Args:
+            query: Текст запроса
+            limit: Максимальное количество результатов
+            
+        Returns:
+            pd.DataFrame: Найденные автомобили, от лучших совпадений к худшим
+        """
+        catalog = self._catalog
+        if catalog.cars_df is None or catalog.fuzzy_index is None:
+            return pd.DataFrame()
+        positions = catalog.fuzzy_index.search(self.normalize_text(query), limit)
+        return catalog.cars_df.iloc[positions]
+    
+    @timed("bot_db_seconds", "method")
     def get_available_frames(self, mount: str, sizes: List[int]) -> pd.DataFrame:
         """
         Получает доступные типы корпусов щеток для заданного крепления и размеров.
@@ -147,11 +893,20 @@ class Database:
             logger.error("База данных щеток не загружена")
             return pd.DataFrame()
         
-        return self.wipers_df[
-            (self.wipers_df[mount].str.lower() == "да") &
-            (self.wipers_df['size'].isin(sizes))
-        ][['gy_frame', 'gy_frame_pic']].drop_duplicates()
+        frames: Dict[Any, Tuple[int, Any]] = {}
+        for bucket in self._lookup_compat(mount, sizes):
+            for frame, by_type in bucket.items():
+                first = min((records[0] for records in by_type.values()), key=lambda r: r['row'])
+                if frame not in frames or first['row'] < frames[frame][0]:
+                    frames[frame] = (first['row'], first['gy_frame_pic'])
+        
+        rows = sorted(frames.items(), key=lambda item: item[1][0])
+        return pd.DataFrame(
+            [(frame, pic) for frame, (_, pic) in rows],
+            columns=['gy_frame', 'gy_frame_pic']
+        )
     
+    @timed("bot_db_seconds", "method")
     def get_available_types(self, frame: str, mount: str, sizes: List[int]) -> pd.DataFrame:
         """
         Получает доступные виды щеток для заданного корпуса, крепления и размеров.
@@ -168,18 +923,24 @@ class Database:
             logger.error("База данных щеток не загружена")
             return pd.DataFrame()
         
-        available_types = self.wipers_df[
-            (self.wipers_df['gy_frame'] == frame) &
-            (self.wipers_df[mount].str.lower() == "да") &
-            (self.wipers_df['size'].isin(sizes))
-        ][['gy_type', 'gy_type_pic']].drop_duplicates()
+        types: Dict[Any, Tuple[int, Any]] = {}
+        for bucket in self._lookup_compat(mount, sizes):
+            for gy_type, records in bucket.get(frame, {}).items():
+                first = records[0]
+                if gy_type not in types or first['row'] < types[gy_type][0]:
+                    types[gy_type] = (first['row'], first['gy_type_pic'])
         
-        # Сортировка: Premium-щетки в начале списка
-        return available_types.sort_values(
-            by="gy_type",
-            key=lambda col: col.str.lower().str.contains("premium").map(lambda x: 0 if x else 1)
+        # Сортировка: Premium-щетки в начале списка, остальные — в порядке каталога
+        rows = sorted(
+            types.items(),
+            key=lambda item: (0 if "premium" in str(item[0]).lower() else 1, item[1][0])
+        )
+        return pd.DataFrame(
+            [(gy_type, pic) for gy_type, (_, pic) in rows],
+            columns=['gy_type', 'gy_type_pic']
         )
     
+    @timed("bot_db_seconds", "method")
     def get_wiper_kit_links(self, frame: str, gy_type: str, mount: str, driver_size: int, pass_size: int) -> Tuple[Optional[str], Optional[str]]:
         """
         Получает ссылки на комплект щеток.
@@ -198,75 +959,69 @@ class Database:
             logger.error("База данных щеток не загружена")
             return None, None
         
-        kits = self.wipers_df[
-            (self.wipers_df['gy_type'].astype(str).str.strip() == str(gy_type).strip()) &
-            (self.wipers_df['gy_frame'].astype(str).str.strip() == str(frame).strip())
-        ].copy()
-        kits = kits[kits[mount].astype(str).str.strip().str.lower() == "да"]
-        kits = kits[kits['Комплект'].notnull() & (kits['Комплект'].astype(str).str.lower() != "нет")]
-        
-        sizes = set()
-        if driver_size and pass_size:
-            sizes.add(f"{driver_size}/{pass_size}")
-            sizes.add(f"{pass_size}/{driver_size}")
-        
-        kits['Комплект_norm'] = kits['Комплект'].apply(lambda s: str(s).replace(" ", "").replace("мм", "").strip())
-        kits = kits[kits['Комплект_norm'].isin(sizes)]
-        
-        ozon_kit_url, wb_kit_url = None, None
-        if not kits.empty:
-            k_row = kits.iloc[0]
-            ozon_kit_url = k_row.get('Ozon', '')
-            wb_kit_url = k_row.get('Wildberries', '')
-        
-        return ozon_kit_url, wb_kit_url
-    
-    def get_single_wiper_links(self, frame: str, gy_type: str, mount: str, size: int) -> Tuple[Optional[str], Optional[str]]:
-        '''
-        Получает ссылки на одну щетку определенного размера.
-        '''
+        if not (driver_size and pass_size):
+            return None, None
+        
+        catalog = self._catalog
+        return self.render_cache.get_or_render(
+            catalog.version, 'kit', (frame, gy_type, mount, driver_size, pass_size),
+            lambda: self._find_kit_links(catalog, frame, gy_type, mount, driver_size, pass_size)
+        )
+    
+    def _find_kit_links(self, catalog: Catalog, frame: str, gy_type: str, mount: str,
+                        driver_size: int, pass_size: int) -> Tuple[Optional[str], Optional[str]]:
+        """Ищет ссылки на комплект в индексе комплектов."""
+        size_a, size_b = self._size_key(driver_size), self._size_key(pass_size)
+        if size_a is None or size_b is None:
+            return None, None
+        sizes = (size_a, size_b) if size_a <= size_b else (size_b, size_a)
+        return catalog.kit_index.get((str(frame).strip(), str(gy_type).strip(), mount, sizes), (None, None))
+    
+    @timed("bot_db_seconds", "method")
+    def get_single_wiper_links(self, frame: str, gy_type: str, mount: str, size: int,
+                               tolerance: Optional[int] = None) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Получает ссылки на одну щетку нужного или ближайшего размера.
+        
+        Args:
+            frame: Тип корпуса
+            gy_type: Вид щетки
+            mount: Тип крепления
+            size: Размер щетки
+            tolerance: Допустимое отклонение размера в мм; по умолчанию Config.SIZE_TOLERANCE_MM
+            
+        Returns:
+            Tuple[Optional[str], Optional[str]]: Ссылки на Ozon и Wildberries
+        """
         if self.wipers_df is None:
             logger.error("База данных щеток не загружена")
             return None, None
-        wipers = self.wipers_df[
-            (self.wipers_df['gy_frame'] == frame) &
-            (self.wipers_df['gy_type'] == gy_type) &
-            (self.wipers_df['size'] == size)
-        ]
-        # Если нет точного совпадения по размеру, ищем ближайший размер (в пределах ±10 мм)
-        if wipers.empty and isinstance(size, (int, float)):
-            size_int = int(size)
-            for delta in range(1, 11):
-                wipers_plus = self.wipers_df[
-                    (self.wipers_df['gy_frame'] == frame) &
-                    (self.wipers_df['gy_type'] == gy_type) &
-                    (self.wipers_df['size'] == size_int + delta)
-                ]
-                wipers_minus = self.wipers_df[
-                    (self.wipers_df['gy_frame'] == frame) &
-                    (self.wipers_df['gy_type'] == gy_type) &
-                    (self.wipers_df['size'] == size_int - delta)
-                ]
-                if not wipers_plus.empty:
-                    wipers = wipers_plus
-                    break
-                elif not wipers_minus.empty:
-                    wipers = wipers_minus
-                    break
-        if wipers.empty:
+        if tolerance is None:
+            tolerance = getattr(Config, 'SIZE_TOLERANCE_MM', SIZE_TOLERANCE_MM)
+        catalog = self._catalog
+        return self.render_cache.get_or_render(
+            catalog.version, 'single', (frame, gy_type, mount, size, tolerance),
+            lambda: self._find_single_wiper_links(catalog, frame, gy_type, size, tolerance)
+        )
+    
+    def _find_single_wiper_links(self, catalog: Catalog, frame: str, gy_type: str, size: int,
+                                 tolerance: int) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Ищет ссылки на щетку ближайшего размера в индексе размеров.
+        
+        При равном отклонении предпочитается больший размер.
+        """
+        size_key = self._size_key(size)
+        entry = catalog.size_index.get((frame, gy_type))
+        if size_key is None or entry is None:
             return None, None
-        ozon_url = None
-        wb_url = None
-        # Приведение к любому варианту (ozon_url/Оzon) зависит от того, как называются столбцы!
-        for _, wiper in wipers.iterrows():
-            if pd.notna(wiper.get('ozon_url')) and not ozon_url:
-                ozon_url = wiper['ozon_url']
-            if pd.notna(wiper.get('Ozon')) and not ozon_url:
-                ozon_url = wiper['Ozon']
-            if pd.notna(wiper.get('wb_url')) and not wb_url:
-                wb_url = wiper['wb_url']
-            if pd.notna(wiper.get('Wildberries')) and not wb_url:
-                wb_url = wiper['Wildberries']
-            if ozon_url and wb_url:
-                break
-        return ozon_url, wb_url
\ No newline at end of file
+        sizes, links = entry
+        i = int(np.searchsorted(sizes, size_key))
+        best = None
+        if i < len(sizes):
+            best = i
+        if i > 0 and (best is None or size_key - sizes[i - 1] < sizes[i] - size_key):
+            best = i - 1
+        if best is None or abs(int(sizes[best]) - size_key) > tolerance:
+            return None, None
+        return links[best]
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+Модуль для отслеживания изменений файлов в цикле asyncio.
+"""
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+from typing import Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Константы inotify из <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Пауза для объединения серии событий (редактор пишет файл в несколько приемов)
+DEBOUNCE_SECONDS = 0.2
+
+def _load_libc() -> Optional[ctypes.CDLL]:
+    """Загружает libc с функциями inotify или возвращает None на других платформах."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1  # noqa: B018 — проверка наличия символа
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+class FileWatcher:
+    """
+    Вызывает функцию при изменении файла.
+
+    На Linux используется inotify на каталоге файла (так ловится и запись на месте,
+    и атомарная замена через rename), на остальных платформах — опрос с интервалом.
+    Функция выполняется в пуле потоков, чтобы не блокировать цикл событий.
+    """
+
+    def __init__(self, filepath: str, callback: Callable[[], None], poll_interval: float = 10):
+        """
+        Инициализация наблюдателя.
+
+        Args:
+            filepath: Путь к отслеживаемому файлу
+            callback: Функция, вызываемая после изменения файла
+            poll_interval: Интервал опроса в секундах, если inotify недоступен
+        """
+        self.filepath = os.path.abspath(filepath)
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self._fd: Optional[int] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._debounce: Optional[asyncio.TimerHandle] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def mode(self) -> str:
+        """Режим работы: inotify, polling или stopped."""
+        if self._fd is not None:
+            return "inotify"
+        return "polling" if self._poll_task is not None else "stopped"
+
+    async def start(self) -> None:
+        """Запускает наблюдение в текущем цикле событий."""
+        self._loop = asyncio.get_running_loop()
+        if self._start_inotify():
+            logger.info(f"[FileWatcher] inotify: {self.filepath}")
+            return
+        self._poll_task = asyncio.create_task(self._poll())
+        logger.info(f"[FileWatcher] Опрос каждые {self.poll_interval} с: {self.filepath}")
+
+    def _start_inotify(self) -> bool:
+        """Подписывается на события каталога через inotify."""
+        libc = _load_libc()
+        if libc is None:
+            return False
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            logger.warning(f"[FileWatcher] inotify_init1: {os.strerror(ctypes.get_errno())}")
+            return False
+        directory = os.path.dirname(self.filepath)
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE)
+        if wd < 0:
+            logger.warning(f"[FileWatcher] inotify_add_watch({directory}): {os.strerror(ctypes.get_errno())}")
+            os.close(fd)
+            return False
+        self._fd = fd
+        self._loop.add_reader(fd, self._on_inotify)
+        return True
+
+    def _on_inotify(self) -> None:
+        """Читает события inotify и планирует вызов функции для нашего файла."""
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        target = os.fsencode(os.path.basename(self.filepath))
+        offset = 0
+        changed = False
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b"\0")
+            offset += name_len
+            changed = changed or name == target
+        if changed:
+            self._schedule()
+
+    def _schedule(self) -> None:
+        """Откладывает вызов функции, объединяя близкие по времени события."""
+        if self._debounce is not None:
+            self._debounce.cancel()
+        self._debounce = self._loop.call_later(DEBOUNCE_SECONDS, self._fire)
+
+    def _fire(self) -> None:
+        """Запускает функцию в пуле потоков."""
+        self._debounce = None
+        task = asyncio.create_task(self._run_callback())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_callback(self) -> None:
+        try:
+            await asyncio.to_thread(self.callback)
+        except Exception as e:
+            logger.error(f"[FileWatcher] Ошибка при обработке изменения {self.filepath}: {e}")
+
+    async def _poll(self) -> None:
+        """Резервный режим: периодически вызывает функцию (она сама сравнивает mtime)."""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self._run_callback()
+
+    async def stop(self) -> None:
+        """Останавливает наблюдение и дожидается выполняющихся вызовов."""
+        if self._debounce is not None:
+            self._debounce.cancel()
+            self._debounce = None
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+            self._poll_task = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
@@ -0,0 +1,160 @@
+"""
+Модуль нечеткого поиска автомобилей по триграммному индексу.
+"""
+import re
+import logging
+from typing import Dict, Iterable, List, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[0-9a-zа-я]+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Разбивает нормализованный текст на слова.
+
+    Args:
+        text: Нормализованный текст (нижний регистр)
+
+    Returns:
+        List[str]: Слова из букв и цифр
+    """
+    return _TOKEN_RE.findall(text)
+
+def trigrams(term: str) -> Set[str]:
+    """
+    Возвращает множество триграмм слова с учетом границ.
+
+    Args:
+        term: Слово
+
+    Returns:
+        Set[str]: Триграммы
+    """
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def max_distance_for(term: str) -> int:
+    """Допустимое число опечаток в зависимости от длины слова."""
+    if len(term) <= 3:
+        return 0
+    if len(term) <= 5:
+        return 1
+    if len(term) <= 9:
+        return 2
+    return 3
+
+def bounded_levenshtein(a: str, b: str, limit: int) -> int:
+    """
+    Считает расстояние Левенштейна с досрочным выходом.
+
+    Args:
+        a: Первая строка
+        b: Вторая строка
+        limit: Максимальное интересующее расстояние
+
+    Returns:
+        int: Расстояние или limit + 1, если оно больше limit
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    if len(a) > len(b):
+        a, b = b, a
+    previous = list(range(len(a) + 1))
+    for i, char_b in enumerate(b, 1):
+        current = [i]
+        row_min = i
+        for j, char_a in enumerate(a, 1):
+            cost = previous[j - 1] + (char_a != char_b)
+            cost = min(cost, previous[j] + 1, current[j - 1] + 1)
+            current.append(cost)
+            row_min = min(row_min, cost)
+        if row_min > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+class FuzzySearchIndex:
+    """
+    Триграммный индекс по словам марок и моделей.
+
+    Кандидаты отбираются по числу общих триграмм, затем проверяются
+    ограниченным расстоянием Левенштейна, поэтому полный перебор строк не нужен.
+    """
+
+    def __init__(self, documents: Iterable[Tuple[int, str]]):
+        """
+        Строит индекс.
+
+        Args:
+            documents: Пары (позиция строки, нормализованный текст "марка модель")
+        """
+        self.term_rows: Dict[str, Set[int]] = {}
+        for pos, text in documents:
+            for term in tokenize(text):
+                self.term_rows.setdefault(term, set()).add(pos)
+        self.terms: List[str] = list(self.term_rows)
+        self.postings: Dict[str, List[int]] = {}
+        for term_id, term in enumerate(self.terms):
+            for gram in trigrams(term):
+                self.postings.setdefault(gram, []).append(term_id)
+        logger.info(f"Индекс нечеткого поиска построен: {len(self.terms)} слов, {len(self.postings)} триграмм")
+
+    def match_term(self, query_term: str) -> Dict[str, int]:
+        """
+        Находит слова индекса, близкие к слову запроса.
+
+        Args:
+            query_term: Слово запроса
+
+        Returns:
+            Dict[str, int]: Слово индекса -> число опечаток
+        """
+        if query_term in self.term_rows:
+            return {query_term: 0}
+        limit = max_distance_for(query_term)
+        if limit == 0:
+            return {}
+        grams = trigrams(query_term)
+        # Каждая опечатка портит не больше трех триграмм
+        min_shared = max(1, len(grams) - 3 * limit)
+        shared: Dict[int, int] = {}
+        for gram in grams:
+            for term_id in self.postings.get(gram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+        result = {}
+        for term_id, count in shared.items():
+            if count < min_shared:
+                continue
+            term = self.terms[term_id]
+            distance = bounded_levenshtein(query_term, term, limit)
+            if distance <= limit:
+                result[term] = distance
+        return result
+
+    def search(self, query: str, limit: int = 10) -> List[int]:
+        """
+        Ищет строки, в которых каждое слово запроса совпадает с точностью до опечаток.
+
+        Args:
+            query: Нормализованный текст запроса
+            limit: Максимальное количество результатов
+
+        Returns:
+            List[int]: Позиции строк, от лучших совпадений к худшим
+        """
+        scores: Dict[int, int] = {}
+        for i, query_term in enumerate(tokenize(query)):
+            term_scores: Dict[int, int] = {}
+            for term, distance in self.match_term(query_term).items():
+                for pos in self.term_rows[term]:
+                    if distance < term_scores.get(pos, distance + 1):
+                        term_scores[pos] = distance
+            if i == 0:
+                scores = term_scores
+            else:
+                scores = {pos: score + term_scores[pos] for pos, score in scores.items() if pos in term_scores}
+            if not scores:
+                return []
+        ranked = sorted(scores.items(), key=lambda item: (item[1], item[0]))
+        return [pos for pos, _ in ranked[:limit]]
@@ -0,0 +1,144 @@
+"""
+Модуль минимального HTTP-сервера на asyncio для служебных маршрутов бота.
+"""
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Максимальный размер тела запроса, байт
+MAX_BODY_SIZE = 1024 * 1024
+# Время ожидания заголовков и тела запроса, с
+READ_TIMEOUT = 10
+
+_REASONS = {
+    200: "OK", 204: "No Content", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+    405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+class HttpRequest:
+    """Разобранный HTTP-запрос."""
+
+    def __init__(self, method: str, path: str, query: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        self.path = path
+        self.query = query
+        # Имена заголовков приведены к нижнему регистру
+        self.headers = headers
+        self.body = body
+
+class HttpResponse:
+    """HTTP-ответ."""
+
+    def __init__(self, status: int = 200, body: bytes = b"", content_type: str = "text/plain; charset=utf-8"):
+        self.status = status
+        self.body = body
+        self.content_type = content_type
+
+Route = Callable[[HttpRequest], Awaitable[HttpResponse]]
+
+class HttpServer:
+    """
+    HTTP/1.1-сервер без внешних зависимостей.
+
+    Поддерживает только то, что нужно боту: маршруты по методу и точному пути,
+    тело фиксированной длины (Content-Length) и одно соединение на запрос.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8080):
+        """
+        Инициализация сервера.
+
+        Args:
+            host: Адрес для прослушивания
+            port: Порт; 0 — выбрать свободный
+        """
+        self.host = host
+        self.port = port
+        self._routes: Dict[Tuple[str, str], Route] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def add_route(self, method: str, path: str, handler: Route) -> None:
+        """
+        Регистрирует обработчик маршрута.
+
+        Args:
+            method: HTTP-метод, например "GET"
+            path: Путь без строки запроса
+            handler: Асинхронный обработчик, возвращающий HttpResponse
+        """
+        self._routes[(method.upper(), path)] = handler
+
+    async def start(self) -> None:
+        """Начинает принимать соединения."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"HTTP-сервер слушает {self.host}:{self.port}")
+
+    async def stop(self) -> None:
+        """Прекращает прием соединений."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Optional[HttpRequest]:
+        """Читает и разбирает запрос; возвращает None при некорректном запросе."""
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        if len(parts) != 3:
+            return None
+        method, target, _ = parts
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", "0") or 0)
+        if length > MAX_BODY_SIZE:
+            raise ValueError("body too large")
+        body = await reader.readexactly(length) if length else b""
+        path, _, query = target.partition("?")
+        return HttpRequest(method.upper(), path, query, headers, body)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Обслуживает одно соединение: читает запрос, вызывает маршрут, пишет ответ."""
+        try:
+            try:
+                request = await asyncio.wait_for(self._read_request(reader), READ_TIMEOUT)
+            except ValueError:
+                response = HttpResponse(413)
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError):
+                return
+            else:
+                response = await self._dispatch(request)
+            reason = _REASONS.get(response.status, "")
+            writer.write(
+                f"HTTP/1.1 {response.status} {reason}\r\n"
+                f"Content-Type: {response.content_type}\r\n"
+                f"Content-Length: {len(response.body)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + response.body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _dispatch(self, request: Optional[HttpRequest]) -> HttpResponse:
+        """Находит обработчик маршрута и вызывает его."""
+        if request is None:
+            return HttpResponse(400)
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self._routes):
+                return HttpResponse(405)
+            return HttpResponse(404)
+        try:
+            return await handler(request)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке {request.method} {request.path}: {e}")
+            return HttpResponse(500)
@@ -0,0 +1,74 @@
+"""
+Модуль для обработки inline-запросов (@bot марка модель).
+"""
+import logging
+
+from telegram import Update, InlineQueryResultArticle, InputTextMessageContent
+from telegram.ext import ContextTypes
+
+from config import Config
+from utils.database import Database
+from utils.logging_utils import log_user_action
+
+# Количество результатов на странице (Telegram допускает не больше 50)
+INLINE_RESULTS_PER_PAGE = 20
+# Время кэширования ответа на стороне Telegram, с
+INLINE_CACHE_TIME = 300
+# Минимальная длина запроса, с которой начинается поиск
+INLINE_MIN_QUERY_LENGTH = 2
+
+logger = logging.getLogger(__name__)
+
+class InlineHandler:
+    """Класс для обработки inline-запросов."""
+
+    def __init__(self, database: Database):
+        """
+        Инициализация обработчика inline-запросов.
+
+        Args:
+            database: База данных
+        """
+        self.db = database
+
+    async def handle_inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        """
+        Отвечает на inline-запрос списком автомобилей с размерами щеток и креплением.
+
+        Результаты берутся из префиксного индекса Database и листаются через next_offset.
+
+        Args:
+            update: Объект обновления Telegram
+            context: Контекст обработчика
+        """
+        inline_query = update.inline_query
+        text = inline_query.query.strip()
+        cache_time = getattr(Config, 'INLINE_CACHE_TIME', INLINE_CACHE_TIME)
+
+        if len(text) < INLINE_MIN_QUERY_LENGTH:
+            await inline_query.answer([], cache_time=cache_time)
+            return
+
+        offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+        if offset == 0:
+            user = inline_query.from_user
+            log_user_action(user.id, user.username, "INLINE_QUERY", text)
+
+        found, next_offset = self.db.search_prefix(
+            text, offset, getattr(Config, 'INLINE_RESULTS_PER_PAGE', INLINE_RESULTS_PER_PAGE)
+        )
+        results = [
+            InlineQueryResultArticle(
+                id=item['id'],
+                title=item['title'],
+                description=item['description'],
+                input_message_content=InputTextMessageContent(item['html'], parse_mode='HTML'),
+            )
+            for item in found
+        ]
+        await inline_query.answer(
+            results,
+            cache_time=cache_time,
+            is_personal=False,
+            next_offset=str(next_offset) if next_offset is not None else "",
+        )
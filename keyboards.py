@@ -0,0 +1,78 @@
+"""
+Модуль для построения inline-клавиатур.
+"""
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+from telegram import InlineKeyboardButton
+
+from utils.database import CarKey
+from utils.user_manager import UserManager
+
+def car_entries(matches: pd.DataFrame, limit: Optional[int] = None,
+                keep_order: bool = False) -> List[CarKey]:
+    """
+    Превращает найденные строки в отсортированный по модели список уникальных автомобилей.
+
+    Args:
+        matches: DataFrame с колонками brand, model, years
+        limit: Максимальное количество записей
+        keep_order: Сохранить порядок строк (например, ранжирование нечеткого поиска) вместо сортировки по модели
+
+    Returns:
+        List[CarKey]: Кортежи (марка, модель, годы)
+    """
+    if matches is None or matches.empty:
+        return []
+    ordered = matches if keep_order else matches.sort_values(by=["model"], ascending=True, kind="stable")
+    entries = list(dict.fromkeys(zip(
+        ordered['brand'].tolist(), ordered['model'].tolist(), ordered['years'].tolist()
+    )))
+    return entries[:limit] if limit is not None else entries
+
+def model_rows(entries: Iterable[CarKey], user_manager: UserManager,
+               buttons_per_row: int = 1) -> List[List[InlineKeyboardButton]]:
+    """
+    Создает кнопки выбора модели.
+
+    Args:
+        entries: Кортежи (марка, модель, годы)
+        user_manager: Менеджер пользователей для хранения данных callback
+        buttons_per_row: Количество кнопок в одной строке
+
+    Returns:
+        List[List[InlineKeyboardButton]]: Строки кнопок
+    """
+    store = user_manager.store_callback_data
+    rows = []
+    row = []
+    for brand, model, years in entries:
+        callback_id = store({"brand": brand, "model": model, "years": years})
+        row.append(InlineKeyboardButton(f"{str(model).upper()} ({years})", callback_data=f"model_{callback_id}"))
+        if len(row) == buttons_per_row:
+            rows.append(row)
+            row = []
+    if row:
+        rows.append(row)
+    return rows
+
+def choice_rows(values: Iterable[Any], field: str, prefix: str, base: Dict[str, Any],
+                user_manager: UserManager) -> List[List[InlineKeyboardButton]]:
+    """
+    Создает по кнопке на каждое значение (корпус или вид щетки).
+
+    Args:
+        values: Значения для кнопок
+        field: Поле данных callback, в которое записывается значение
+        prefix: Префикс callback_data, например "frame_"
+        base: Общие данные callback (автомобиль, крепление, размеры)
+        user_manager: Менеджер пользователей для хранения данных callback
+
+    Returns:
+        List[List[InlineKeyboardButton]]: Строки кнопок
+    """
+    store = user_manager.store_callback_data
+    return [
+        [InlineKeyboardButton(str(value), callback_data=f"{prefix}{store({**base, field: value})}")]
+        for value in values
+    ]
@@ -2,23 +2,33 @@
 Главный модуль Telegram-бота для подбора щеток Goodyear.
 """
 import os
+import signal
 import logging
 import asyncio
 from typing import Dict, Any, Optional, List
 
+from telegram import Update
 from telegram.ext import (
-    Application, CallbackQueryHandler, CommandHandler,
+    Application, CallbackQueryHandler, CommandHandler, InlineQueryHandler,
     ContextTypes, MessageHandler as TelegramMessageHandler, filters
 )
 
 from config import Config
 from utils.database import Database
 from utils.user_manager import UserManager
+from utils.storage import MemoryStorage, SQLiteStorage
+from utils.media_cache import MediaCache
 from utils.synonyms import SynonymManager
+from utils.metrics import metrics, timed_handler, TimedHTTPXRequest
+from utils.http_server import HttpServer, HttpRequest, HttpResponse
+from utils.update_processor import ChatOrderedUpdateProcessor, DEFAULT_CONCURRENT_UPDATES
+from utils.webhook import WebhookServer
+from utils.outbound_scheduler import OutboundScheduler, GLOBAL_RATE, CHAT_RATE
 from utils.logging_utils import setup_logging
 from handlers.message_handler import MessageHandler
 from handlers.callback_handler import CallbackHandler
 from handlers.command_handler import CommandHandler as BotCommandHandler
+from handlers.inline_handler import InlineHandler
 
 # Настройка логирования
 setup_logging()
@@ -35,45 +45,120 @@ class WipersBot:
             return
         
         # Инициализация компонентов
-        self.db = Database()
-        self.user_manager = UserManager()
+        self.db = Database(reload_interval=60)
+        self.user_manager = UserManager(self._create_storage())
         self.synonym_manager = SynonymManager("synonyms.csv", reload_interval=5)
+        self.synonym_manager.set_known_brands(self.db.catalog.brands)
+        self.db.add_reload_listener(lambda catalog: self.synonym_manager.set_known_brands(catalog.brands))
+        
+        self.media_cache = MediaCache(getattr(Config, 'MEDIA_CACHE_PATH', os.path.join('cache', 'media_cache.json')))
+        self.http_server: Optional[HttpServer] = None
+        concurrent_updates = getattr(Config, 'CONCURRENT_UPDATES', DEFAULT_CONCURRENT_UPDATES)
+        self.update_processor = ChatOrderedUpdateProcessor(concurrent_updates) if concurrent_updates > 1 else None
+        self.outbound_scheduler = OutboundScheduler(
+            global_rate=getattr(Config, 'OUTBOUND_GLOBAL_RATE', GLOBAL_RATE),
+            chat_rate=getattr(Config, 'OUTBOUND_CHAT_RATE', CHAT_RATE),
+        )
+        self._register_metrics()
         
         # Инициализация обработчиков
         self.message_handler = MessageHandler(self.db, self.user_manager, self.synonym_manager)
-        self.callback_handler = CallbackHandler(self.db, self.user_manager, self.synonym_manager)
-        self.command_handler = BotCommandHandler(self.user_manager)
+        self.callback_handler = CallbackHandler(self.db, self.user_manager, self.synonym_manager, self.media_cache)
+        self.command_handler = BotCommandHandler(self.user_manager, self.media_cache)
+        self.inline_handler = InlineHandler(self.db)
         
         # Инициализация приложения
-        self.application = Application.builder().token(Config.TELEGRAM_TOKEN).build()
+        builder = (
+            Application.builder()
+            .token(Config.TELEGRAM_TOKEN)
+            .request(TimedHTTPXRequest())
+            .rate_limiter(self.outbound_scheduler)
+            .post_init(self._post_init)
+            .post_shutdown(self._post_shutdown)
+        )
+        # Обновления разных чатов обрабатываются параллельно, одного чата — по порядку
+        if self.update_processor is not None:
+            builder = builder.concurrent_updates(self.update_processor)
+        self.application = builder.build()
         
         # Регистрация обработчиков
         self._register_handlers()
         
         logger.info("Бот инициализирован успешно")
     
+    @staticmethod
+    def _create_storage() -> MemoryStorage:
+        """
+        Создает хранилище пользовательских данных.
+        
+        Returns:
+            MemoryStorage: SQLite-хранилище, если задан Config.STORAGE_PATH, иначе хранилище в памяти
+        """
+        storage_path = getattr(Config, 'STORAGE_PATH', None)
+        if storage_path:
+            return SQLiteStorage(storage_path)
+        return MemoryStorage()
+    
     def _register_handlers(self) -> None:
         """Регистрирует обработчики команд и сообщений."""
         # Обработчики команд
-        self.application.add_handler(CommandHandler("start", self.command_handler.start))
-        self.application.add_handler(CommandHandler("help", self.command_handler.help))
-        self.application.add_handler(CommandHandler("stats", self.command_handler.stats))
+        self.application.add_handler(CommandHandler("start", timed_handler("start", self.command_handler.start)))
+        self.application.add_handler(CommandHandler("help", timed_handler("help", self.command_handler.help)))
+        self.application.add_handler(CommandHandler("stats", timed_handler("stats", self.command_handler.stats)))
         
-        self.application.add_handler(CommandHandler("feedback", self.command_handler.feedback))
-        self.application.add_handler(CommandHandler("cancel", self.command_handler.cancel))
-        self.application.add_handler(CommandHandler("brand", self.command_handler.brand))  # Новая команда
+        self.application.add_handler(CommandHandler("feedback", timed_handler("feedback", self.command_handler.feedback)))
+        self.application.add_handler(CommandHandler("cancel", timed_handler("cancel", self.command_handler.cancel)))
+        self.application.add_handler(CommandHandler("brand", timed_handler("brand", self.command_handler.brand)))  # Новая команда
         
         # Обработчик callback-запросов
-        self.application.add_handler(CallbackQueryHandler(self.callback_handler.handle_callback_query))
+        self.application.add_handler(CallbackQueryHandler(
+            timed_handler("callback", self.callback_handler.handle_callback_query)
+        ))
+        
+        # Обработчик inline-запросов (@bot марка модель)
+        self.application.add_handler(InlineQueryHandler(
+            timed_handler("inline", self.inline_handler.handle_inline_query)
+        ))
         
         # Обработчик текстовых сообщений
         self.application.add_handler(TelegramMessageHandler(
             filters.TEXT & ~filters.COMMAND, 
-            self._handle_message
+            timed_handler("message", self._handle_message)
         ))
         
         logger.info("Обработчики зарегистрированы")
     
+    def _register_metrics(self) -> None:
+        """Подключает текущие показатели кэшей и каталога к выводу метрик."""
+        metrics.add_collector("bot_catalog", self.db.get_reload_stats)
+        metrics.add_collector("bot_render_cache", self.db.get_render_stats)
+        metrics.add_collector("bot_callback_store", self.user_manager.callback_storage.get_stats)
+        metrics.add_collector("bot_media_cache", self.media_cache.get_stats)
+        metrics.add_collector("bot_outbound", self.outbound_scheduler.get_stats)
+        if self.update_processor is not None:
+            metrics.add_collector("bot_updates", self.update_processor.get_stats)
+    
+    async def _serve_metrics(self, request: HttpRequest) -> HttpResponse:
+        """Отдает метрики в текстовом формате Prometheus."""
+        return HttpResponse(200, metrics.render().encode('utf-8'), "text/plain; version=0.0.4; charset=utf-8")
+    
+    async def _post_init(self, application: Application) -> None:
+        """Запускает фоновые задачи после инициализации приложения."""
+        await self.synonym_manager.start()
+        await self.db.start()
+        metrics_port = getattr(Config, 'METRICS_PORT', None)
+        if metrics_port:
+            self.http_server = HttpServer(getattr(Config, 'METRICS_HOST', '127.0.0.1'), metrics_port)
+            self.http_server.add_route("GET", "/metrics", self._serve_metrics)
+            await self.http_server.start()
+    
+    async def _post_shutdown(self, application: Application) -> None:
+        """Останавливает фоновые задачи при завершении приложения."""
+        await self.synonym_manager.stop()
+        await self.db.stop()
+        if self.http_server is not None:
+            await self.http_server.stop()
+    
     async def _handle_message(self, update, context) -> None:
         """
         Обрабатывает текстовые сообщения.
@@ -90,19 +175,78 @@ class WipersBot:
         await self.message_handler.handle_message(update, context)
     
     def run(self) -> None:
-        """Запускает бота."""
+        """Запускает бота в режиме Config.BOT_MODE: "polling" (по умолчанию) или "webhook"."""
         try:
             logger.info("Запуск бота...")
-            self.application.run_polling()
+            if getattr(Config, 'BOT_MODE', 'polling') == 'webhook':
+                asyncio.run(self.run_webhook())
+            else:
+                self.application.run_polling()
         except Exception as e:
             logger.error(f"Ошибка при запуске бота: {e}")
+        finally:
+            self.user_manager.close()
+    
+    async def run_webhook(self) -> None:
+        """
+        Запускает бота в режиме вебхука на встроенном HTTP-сервере и работает до SIGINT/SIGTERM.
+        
+        Параметры берутся из Config: WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET
+        и WEBHOOK_URL — публичный адрес, который регистрируется через setWebhook. С WEBHOOK_URL
+        бот не запускается без WEBHOOK_SECRET. Без WEBHOOK_URL вебхук не регистрируется и по
+        умолчанию слушает только 127.0.0.1, что удобно для локальной проверки записанными обновлениями.
+        """
+        application = self.application
+        webhook_url = getattr(Config, 'WEBHOOK_URL', None)
+        secret_token = getattr(Config, 'WEBHOOK_SECRET', None)
+        if webhook_url and not secret_token:
+            logger.error("WEBHOOK_SECRET не задан: вебхук не запущен, иначе он принимал бы обновления от кого угодно")
+            return
+        webhook = WebhookServer(
+            application,
+            getattr(Config, 'WEBHOOK_HOST', '127.0.0.1'),
+            getattr(Config, 'WEBHOOK_PORT', 8443),
+            getattr(Config, 'WEBHOOK_PATH', '/telegram'),
+            secret_token=secret_token,
+            health=self.db.get_reload_stats,
+        )
+        
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except (NotImplementedError, RuntimeError):
+                pass
+        
+        await application.initialize()
+        try:
+            if application.post_init:
+                await application.post_init(application)
+            if webhook_url:
+                await application.bot.set_webhook(
+                    url=webhook_url,
+                    secret_token=secret_token,
+                    allowed_updates=Update.ALL_TYPES,
+                )
+            await application.start()
+            await webhook.start()
+            await stop_event.wait()
+        finally:
+            logger.info("Остановка вебхука...")
+            await webhook.stop()
+            if application.running:
+                await application.stop()
+            if application.post_shutdown:
+                await application.post_shutdown(application)
+            await application.shutdown()
     
     def stop(self) -> None:
         """Останавливает бота."""
         try:
             logger.info("Остановка бота...")
             self.application.stop()
-            self.synonym_manager.stop()
+            self.user_manager.close()
         except Exception as e:
             logger.error(f"Ошибка при остановке бота: {e}")
 
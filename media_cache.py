@@ -0,0 +1,201 @@
+"""
+Модуль кэширования file_id Telegram для локальных медиафайлов.
+"""
+import os
+import json
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from telegram import InputFile, Message
+from telegram.error import BadRequest
+
+from utils.async_io import read_bytes
+
+logger = logging.getLogger(__name__)
+
+# Фрагменты текста ошибок Telegram, означающих, что сохраненный file_id больше не действителен
+FILE_ID_ERRORS = (
+    "wrong file identifier",
+    "wrong remote file identifier",
+    "file reference expired",
+    "wrong file_id",
+    "wrong padding",
+)
+
+def is_file_id_error(error: BadRequest) -> bool:
+    """
+    Проверяет, что ошибка вызвана недействительным file_id, а не самим запросом.
+
+    Args:
+        error: Ошибка Telegram
+
+    Returns:
+        bool: True, если файл нужно загрузить заново
+    """
+    message = str(error).lower()
+    return any(fragment in message for fragment in FILE_ID_ERRORS)
+
+def extract_file_id(message: Message) -> Optional[str]:
+    """
+    Достает file_id загруженного медиафайла из отправленного сообщения.
+
+    Args:
+        message: Сообщение Telegram с фото, видео, анимацией или документом
+
+    Returns:
+        Optional[str]: file_id или None, если медиафайла в сообщении нет
+    """
+    if message is None:
+        return None
+    if message.photo:
+        return message.photo[-1].file_id
+    for media in (message.video, message.animation, message.document):
+        if media is not None:
+            return media.file_id
+    return None
+
+class MediaCache:
+    """
+    Кэш file_id для картинок и видео, которые бот отправляет с диска.
+
+    После первой загрузки файл отправляется по file_id без повторной выгрузки.
+    Запись привязана к размеру и времени изменения файла, поэтому замена
+    картинки на диске приводит к новой загрузке.
+    """
+
+    def __init__(self, path: str = os.path.join("cache", "media_cache.json")):
+        """
+        Инициализация кэша.
+
+        Args:
+            path: Путь к JSON-файлу, в котором хранится кэш между перезапусками
+        """
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.uploads = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Загружает кэш с диска."""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._entries = json.load(f)
+            logger.info(f"[MediaCache] Загружено {len(self._entries)} file_id")
+        except Exception as e:
+            logger.warning(f"[MediaCache] Не удалось прочитать кэш {self.path}: {e}")
+
+    def _save(self) -> None:
+        """Атомарно сохраняет кэш на диск."""
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with self._lock:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.warning(f"[MediaCache] Не удалось сохранить кэш {self.path}: {e}")
+
+    @staticmethod
+    def _fingerprint(file_path: str) -> Dict[str, int]:
+        """Возвращает размер и время изменения файла."""
+        stat = os.stat(file_path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def get(self, file_path: str) -> Optional[str]:
+        """
+        Получает file_id, если файл не менялся с момента загрузки.
+
+        Args:
+            file_path: Путь к файлу
+
+        Returns:
+            Optional[str]: file_id или None
+        """
+        entry = self._entries.get(os.path.abspath(file_path))
+        if entry is None:
+            return None
+        try:
+            fingerprint = self._fingerprint(file_path)
+        except OSError:
+            return None
+        if entry.get('size') != fingerprint['size'] or entry.get('mtime_ns') != fingerprint['mtime_ns']:
+            return None
+        return entry.get('file_id')
+
+    def put(self, file_path: str, file_id: str) -> None:
+        """
+        Запоминает file_id для файла.
+
+        Args:
+            file_path: Путь к файлу
+            file_id: file_id, полученный от Telegram
+        """
+        try:
+            fingerprint = self._fingerprint(file_path)
+        except OSError:
+            return
+        with self._lock:
+            self._entries[os.path.abspath(file_path)] = {**fingerprint, 'file_id': file_id}
+        self._save()
+
+    def invalidate(self, file_path: str) -> None:
+        """
+        Удаляет запись о файле.
+
+        Args:
+            file_path: Путь к файлу
+        """
+        with self._lock:
+            removed = self._entries.pop(os.path.abspath(file_path), None)
+        if removed is not None:
+            self._save()
+
+    async def send(self, file_path: str, send: Callable[[Any], Awaitable[Message]]) -> Message:
+        """
+        Отправляет файл по file_id, а если его нет — загружает и запоминает file_id.
+
+        Проверка файла, чтение и сохранение кэша выполняются в пуле потоков.
+
+        Args:
+            file_path: Путь к файлу
+            send: Функция отправки, принимающая file_id или InputFile с содержимым файла
+
+        Returns:
+            Message: Отправленное сообщение
+        """
+        file_id = await asyncio.to_thread(self.get, file_path)
+        if file_id:
+            try:
+                message = await send(file_id)
+                self.hits += 1
+                return message
+            except BadRequest as e:
+                # Остальные ошибки (например, "message is not modified") не связаны с file_id
+                if not is_file_id_error(e):
+                    raise
+                logger.warning(f"[MediaCache] file_id для {file_path} отклонен, загружаем заново: {e}")
+                await asyncio.to_thread(self.invalidate, file_path)
+
+        data = await read_bytes(file_path)
+        message = await send(InputFile(data, filename=os.path.basename(file_path)))
+        self.uploads += 1
+        file_id = extract_file_id(message)
+        if file_id:
+            await asyncio.to_thread(self.put, file_path, file_id)
+        return message
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Получает метрики кэша.
+
+        Returns:
+            Dict[str, int]: Число записей, отправок по file_id и загрузок
+        """
+        return {'entries': len(self._entries), 'hits': self.hits, 'uploads': self.uploads}
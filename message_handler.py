@@ -18,6 +18,9 @@ from utils.search import CarSearchEngine
 from utils.user_manager import UserManager
 from utils.synonyms import SynonymManager
 from utils.logging_utils import log_user_action
+from utils.metrics import metrics
+from utils.text_utils import translit_ru_to_en
+from handlers.keyboards import car_entries, model_rows, choice_rows
 
 logger = logging.getLogger(__name__)
 MODELS_PER_PAGE = 50
@@ -37,23 +40,22 @@ class MessageHandler:
         self.db = database
         self.user_manager = user_manager
         self.synonym_manager = synonym_manager
-        self.search_engine = CarSearchEngine(database.cars_df)
-
-    async def show_models_with_pagination(self, update, context, matches, brand_query, page=0, edit=False):
-        matches = matches.sort_values(by=["model"], ascending=True, kind="stable")
-        total = len(matches)
+        self._search_engine: Optional[CarSearchEngine] = None
+        self._search_engine_version: Optional[int] = None
+
+    @property
+    def search_engine(self) -> CarSearchEngine:
+        """Поисковый движок для текущей версии каталога; пересоздается после перезагрузки."""
+        if self._search_engine is None or self._search_engine_version != self.db.version:
+            self._search_engine_version = self.db.version
+            self._search_engine = CarSearchEngine(self.db.cars_df)
+        return self._search_engine
+
+    async def show_models_with_pagination(self, update, context, entries, brand_query, page=0, edit=False):
+        total = len(entries)
         start = page * MODELS_PER_PAGE
         end = start + MODELS_PER_PAGE
-        current_matches = matches.iloc[start:end]
-        buttons = []
-        for _, row in current_matches.iterrows():
-            callback_id = self.user_manager.store_callback_data({
-                "brand": row['brand'],
-                "model": row['model'],
-                "years": row['years'],
-            })
-            button_text = f"{row['model'].upper()} ({row['years']})"
-            buttons.append([InlineKeyboardButton(button_text, callback_data=f"model_{callback_id}")])
+        buttons = model_rows(entries[start:end], self.user_manager)
         nav_buttons = []
         if page > 0:
             nav_buttons.append(InlineKeyboardButton("⬅️ Назад", callback_data=f"models_page_{page-1}_{brand_query}"))
@@ -87,29 +89,25 @@ class MessageHandler:
         await update.message.chat.send_action("typing")
         brand_query_norm = brand_query.strip().lower()
 
-        matches = self.db.cars_df[self.db.cars_df['brand'].str.lower() == brand_query_norm]
+        entries = self.db.get_brand_models(brand_query_norm)
         canonical_for_pagination = brand_query
 
         # 2. Синонимы
-        if matches.empty:
-            synonyms = self.synonym_manager.get_synonyms()
-            for canon, syns in synonyms.items():
-                all_syns = [canon] + (syns if isinstance(syns, list) else [syns])
-                all_syns_norm = [s.lower() for s in all_syns]
-                if brand_query_norm in all_syns_norm:
-                    matches = self.db.cars_df[self.db.cars_df['brand'].str.lower() == canon.lower()]
-                    canonical_for_pagination = canon
-                    break
+        if not entries:
+            canon = self.synonym_manager.get_snapshot().resolve_brand(brand_query_norm)
+            if canon:
+                entries = self.db.get_brand_models(canon)
+                canonical_for_pagination = canon
 
         # 3. Транслитерация
-        if matches.empty:
+        if not entries:
             translit_brand = translit_ru_to_en(brand_query_norm)
-            matches = self.db.cars_df[self.db.cars_df['brand'].str.lower() == translit_brand]
-            if not matches.empty:
+            entries = self.db.get_brand_models(translit_brand)
+            if entries:
                 canonical_for_pagination = translit_brand
 
         # 4. Если ничего не найдено — ошибка
-        if matches.empty:
+        if not entries:
             await update.message.reply_text(
                 f'По марке <b>"{brand_query}"</b> не найдено ни одной модели.',
                 parse_mode='HTML',
@@ -117,7 +115,7 @@ class MessageHandler:
             )
             return
 
-        await self.show_models_with_pagination(update, context, matches, canonical_for_pagination, page=0)
+        await self.show_models_with_pagination(update, context, entries, canonical_for_pagination, page=0)
 
     def _create_model_buttons_multirow(self, matches: pd.DataFrame, buttons_per_row: int = 1) -> List[List[InlineKeyboardButton]]:
         """
@@ -131,41 +129,7 @@ class MessageHandler:
             List[List[InlineKeyboardButton]]: Список кнопок
 
         """
-        matches = matches.sort_values(by=["model"], ascending=True, kind="stable")
-        buttons = []
-        current_row = []
-        seen = set()
-        button_count = 0
-        
-        for _, row in matches.iterrows():
-            key = (row['brand'], row['model'], row['years'])
-            if key not in seen:
-                callback_id = self.user_manager.store_callback_data({
-                    "brand": row['brand'],
-                    "model": row['model'],
-                    "years": row['years'],
-                })
-                callback_data = f"model_{callback_id}"
-                button_text = f"{row['model'].upper()} ({row['years']})"
-                
-                current_row.append(InlineKeyboardButton(button_text, callback_data=callback_data))
-                button_count += 1
-                
-                # Если достигли нужного количества кнопок в строке или это последняя модель
-                if button_count % buttons_per_row == 0:
-                    buttons.append(current_row)
-                    current_row = []
-                
-                seen.add(key)
-                
-                if len(seen) >= Config.MAX_RESULTS:
-                    break
-        
-        # Добавляем оставшиеся кнопки, если есть
-        if current_row:
-            buttons.append(current_row)
-        
-        return buttons
+        return model_rows(car_entries(matches, Config.MAX_RESULTS), self.user_manager, buttons_per_row)
     
     async def handle_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
         '''
@@ -193,17 +157,25 @@ class MessageHandler:
         contains_digits = any(char.isdigit() for char in text)
 
         if len(words) <= 2 and not contains_digits:
-            brand_matches = self.db.cars_df[self.db.cars_df['brand'].str.lower() == text.lower()]
-            if not brand_matches.empty:
+            if text.lower() in self.db.catalog.brands:
                 await self.handle_brand_search(update, context, text)
                 return
 
-        result = self.search_engine.search(text, synonyms, log_debug=log_debug)
+        with metrics.timer("bot_db_seconds", method="search"):
+            result = self.search_engine.search(text, synonyms, log_debug=log_debug)
         matches = result['matches']
         similar = result['similar']
 
+        # Если ничего не нашлось — пробуем нечеткий поиск (опечатки в марке или модели)
+        ranked = False
+        if matches.empty and similar.empty:
+            similar = self.db.fuzzy_search(text, limit=Config.MAX_RESULTS)
+            ranked = True
+            log_debug(f"fuzzy: {len(similar)} кандидатов")
+
         if matches.empty and not similar.empty:
-            buttons = self._create_model_buttons(similar)
+            # Результаты нечеткого поиска уже упорядочены по близости к запросу
+            buttons = self._create_model_buttons(similar, keep_order=ranked)
             buttons.append([InlineKeyboardButton("🔄 Новый поиск", callback_data="new_search")])
             await update.message.reply_text(
                 f"🔍 По запросу <b>\"{text}\"</b> точных совпадений не найдено, но есть похожие модели:\n\n"
@@ -225,7 +197,7 @@ class MessageHandler:
 
         if len(matches) == 1:
             car = matches.iloc[0]
-            car_info = self.db.get_car_info(car)
+            car_info = self.db.get_car_html(car['brand'], car['model'], car['years']) or self.db.get_car_info(car)
             mount = car['mount']
             driver_size = int(car['driver']) if str(car['driver']).isdigit() else None
             pass_size = int(car['passanger']) if str(car['passanger']).isdigit() else None
@@ -238,20 +210,14 @@ class MessageHandler:
                 )
                 return
 
-            buttons = []
-            for _, rowf in available_frames.iterrows():
-                frame = rowf['gy_frame']
-                frame_id = self.user_manager.store_callback_data({
-                    "brand": car['brand'],
-                    "model": car['model'],
-                    "years": car['years'],
-                    "mount": mount,
-                    "driver_size": driver_size,
-                    "pass_size": pass_size,
-                    "gy_frame": frame
-                })
-                btn = InlineKeyboardButton(str(frame), callback_data=f"frame_{frame_id}")
-                buttons.append([btn])
+            buttons = choice_rows(available_frames['gy_frame'].tolist(), "gy_frame", "frame_", {
+                "brand": car['brand'],
+                "model": car['model'],
+                "years": car['years'],
+                "mount": mount,
+                "driver_size": driver_size,
+                "pass_size": pass_size,
+            }, self.user_manager)
             buttons.append([InlineKeyboardButton("🔄 Новый поиск", callback_data="new_search")])
             await update.message.reply_text(
                 car_info + "\n<b>Выберите тип щётки:</b>",
@@ -263,7 +229,7 @@ class MessageHandler:
         # --- ВАЖНО: вот тут патч! ---
         # Если найдено много совпадений — используем пагинацию!
         if len(matches) > MODELS_PER_PAGE:
-            await self.show_models_with_pagination(update, context, matches, text, page=0)
+            await self.show_models_with_pagination(update, context, car_entries(matches), text, page=0)
             return
 
         # Если совпадений мало — старое поведение
@@ -276,22 +242,5 @@ class MessageHandler:
             parse_mode='HTML'
         )
     
-    def _create_model_buttons(self, matches: pd.DataFrame) -> List[List[InlineKeyboardButton]]:
-        matches = matches.sort_values(by=["model"], ascending=True, kind="stable") 
-        buttons = []
-        seen = set()
-        for _, row in matches.iterrows():
-            key = (row['brand'], row['model'], row['years'])
-            if key not in seen:
-                callback_id = self.user_manager.store_callback_data({
-                    "brand": row['brand'],
-                    "model": row['model'],
-                    "years": row['years'],
-                })
-                callback_data = f"model_{callback_id}"
-                button_text = f"{row['model'].upper()} ({row['years']})"
-                buttons.append([InlineKeyboardButton(button_text, callback_data=callback_data)])
-                seen.add(key)
-            if len(buttons) >= Config.MAX_RESULTS:
-                break
-        return buttons
\ No newline at end of file
+    def _create_model_buttons(self, matches: pd.DataFrame, keep_order: bool = False) -> List[List[InlineKeyboardButton]]:
+        return model_rows(car_entries(matches, Config.MAX_RESULTS, keep_order), self.user_manager)
\ No newline at end of file
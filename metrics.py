@@ -0,0 +1,260 @@
+"""
+Модуль метрик: гистограммы задержек, счетчики и вывод в текстовом формате Prometheus.
+"""
+import time
+import asyncio
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from telegram.request import HTTPXRequest
+
+# Границы корзин гистограмм задержек, с
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Префиксы callback_data; более длинные проверяются раньше
+CALLBACK_PREFIXES = (
+    "models_page_", "back_to_frames_", "back_to_types_", "add_favorite_", "remove_favorite_",
+    "single_left_", "single_right_", "view_favorites", "new_search",
+    "model_", "frame_", "type_", "kit_", "single_", "page_",
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def callback_prefix(data: str) -> str:
+    """
+    Определяет префикс callback_data для меток метрик.
+
+    Args:
+        data: Данные кнопки
+
+    Returns:
+        str: Известный префикс или "other"
+    """
+    for prefix in CALLBACK_PREFIXES:
+        if data.startswith(prefix):
+            return prefix
+    return "other"
+
+def _escape(value: Any) -> str:
+    """Экранирует значение метки."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value: Union[int, float]) -> str:
+    """Форматирует значение без потери точности: целые — как есть, дробные — через repr."""
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+def _format_labels(labels: Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+    """Форматирует метки в виде {name="value",...}."""
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in items) + "}"
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Добавляет наблюдение."""
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса.
+
+    Гистограммы и счетчики создаются при первом обращении. Дополнительно можно
+    подключить источники текущих значений (размеры кэшей и т.п.), которые
+    опрашиваются при выводе.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._collectors: List[Tuple[str, Callable[[], Dict[str, Any]]]] = []
+        self.started = time.time()
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """
+        Добавляет наблюдение в гистограмму.
+
+        Args:
+            name: Имя метрики
+            value: Значение, обычно длительность в секундах
+            **labels: Метки
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        """
+        Увеличивает счетчик.
+
+        Args:
+            name: Имя метрики
+            value: Приращение
+            **labels: Метки
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        """
+        Замеряет длительность блока и записывает ее в гистограмму.
+
+        Исключения, вышедшие из блока, дополнительно учитываются в счетчике
+        <name без _seconds>_errors_total.
+
+        Args:
+            name: Имя гистограммы
+            **labels: Метки
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            base = name[:-len("_seconds")] if name.endswith("_seconds") else name
+            self.inc(f"{base}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def add_collector(self, prefix: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """
+        Подключает источник текущих значений.
+
+        Числовые значения словаря выводятся как метрики <prefix>_<ключ>.
+
+        Args:
+            prefix: Префикс имен метрик
+            collect: Функция, возвращающая словарь значений, например get_stats
+        """
+        self._collectors.append((prefix, collect))
+
+    def get_histogram(self, name: str, **labels: str) -> Optional[Histogram]:
+        """Возвращает гистограмму по имени и меткам, если она есть."""
+        return self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def render(self) -> str:
+        """
+        Выводит все метрики в текстовом формате Prometheus.
+
+        Returns:
+            str: Текст для ответа на /metrics
+        """
+        lines = [
+            "# TYPE bot_uptime_seconds gauge",
+            f"bot_uptime_seconds {time.time() - self.started:.3f}",
+        ]
+        with self._lock:
+            for name in sorted(self._histograms):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels, ('le', repr(bound)))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+            for name in sorted(self._counters):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for prefix, collect in self._collectors:
+            try:
+                values = collect()
+            except Exception:
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+# Общий реестр процесса
+metrics = MetricsRegistry()
+
+def timed(name: str, label: str = "name") -> Callable[[Callable], Callable]:
+    """
+    Декоратор, записывающий длительность вызова в гистограмму с меткой по имени функции.
+
+    Подходит и для обычных, и для асинхронных функций.
+
+    Args:
+        name: Имя гистограммы
+        label: Имя метки, в которую записывается имя функции
+
+    Returns:
+        Callable: Декоратор
+    """
+    def decorator(func: Callable) -> Callable:
+        labels = {label: func.__name__}
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with metrics.timer(name, **labels):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with metrics.timer(name, **labels):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def timed_handler(handler_name: str, callback: Callable) -> Callable:
+    """
+    Оборачивает обработчик обновлений Telegram замером длительности.
+
+    Args:
+        handler_name: Имя обработчика для метки handler
+        callback: Асинхронный обработчик (update, context)
+
+    Returns:
+        Callable: Обработчик с замером
+    """
+    @functools.wraps(callback)
+    async def wrapper(update, context):
+        with metrics.timer("bot_handler_seconds", handler=handler_name):
+            return await callback(update, context)
+    return wrapper
+
+class TimedHTTPXRequest(HTTPXRequest):
+    """
+    HTTP-клиент Bot API, замеряющий время каждого вызова по имени метода.
+
+    Ответы с кодом 400 и выше, как и сетевые ошибки, учитываются в bot_telegram_errors_total.
+    """
+
+    async def do_request(self, url: str, method: str, *args, **kwargs) -> Tuple[int, bytes]:
+        api_method = url.rsplit("/", 1)[-1]
+        with metrics.timer("bot_telegram_seconds", method=api_method):
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+        if code >= 400:
+            metrics.inc("bot_telegram_errors_total", method=api_method)
+        return code, payload
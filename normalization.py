@@ -0,0 +1,51 @@
+"""
+Модуль нормализации текста для поиска.
+
+Одни и те же правила применяются к запросам пользователей и к колонкам каталога.
+"""
+import re
+from typing import Any
+
+import pandas as pd
+
+from utils.text_utils import translit_ru_to_en
+
+# Замена "ё" на "е" после приведения к нижнему регистру
+_YO_TABLE = str.maketrans({'ё': 'е'})
+_CYRILLIC_PATTERN = r'[а-я]'
+_CYRILLIC_RE = re.compile(_CYRILLIC_PATTERN)
+
+def normalize_text(s: Any) -> str:
+    """
+    Нормализует текст для поиска.
+
+    Args:
+        s: Текст для нормализации
+
+    Returns:
+        str: Нормализованный текст
+    """
+    s = str(s).strip().lower().translate(_YO_TABLE)
+    if _CYRILLIC_RE.search(s):
+        s = translit_ru_to_en(s)
+    return s
+
+def normalize_series(series: pd.Series) -> pd.Series:
+    """
+    Нормализует колонку целиком, давая тот же результат, что normalize_text для каждой ячейки.
+
+    Приведение регистра и замена "ё" выполняются векторно, а транслитерация —
+    один раз для каждого уникального значения с кириллицей.
+
+    Args:
+        series: Колонка с текстом
+
+    Returns:
+        pd.Series: Нормализованная колонка
+    """
+    values = series.astype(str).str.strip().str.lower().str.translate(_YO_TABLE)
+    cyrillic = values.str.contains(_CYRILLIC_PATTERN, regex=True)
+    if cyrillic.any():
+        translit = {value: translit_ru_to_en(value) for value in values[cyrillic].unique()}
+        values = values.mask(cyrillic, values.map(translit))
+    return values
@@ -0,0 +1,233 @@
+"""
+Модуль планировщика исходящих запросов к Bot API с ограничением частоты.
+"""
+import time
+import heapq
+import asyncio
+import logging
+import datetime
+import itertools
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Tuple, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты запросов: меньшее значение обслуживается раньше.
+# Передаются обработчиками через rate_limit_args, например bot.send_message(..., rate_limit_args=PRIORITY_BULK)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 10
+
+# Ограничения Telegram: около 30 сообщений в секунду всего, 1 в секунду в чат, 20 в минуту в группу
+GLOBAL_RATE = 30.0
+CHAT_RATE = 1.0
+GROUP_RATE = 20 / 60
+# Допустимые всплески: ответ на нажатие кнопки обычно состоит из 2-3 запросов подряд
+GLOBAL_BURST = 30
+CHAT_BURST = 3
+GROUP_BURST = 3
+# Сколько раз повторять запрос после RetryAfter
+MAX_RETRIES = 3
+# Число чатов, после которого из словаря удаляются давно не использованные корзины
+CHAT_BUCKETS_PRUNE_SIZE = 10_000
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не больше capacity в запасе."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        # Ожидающие в take() получают токены в порядке очереди
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Начисляет токены за прошедшее время."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self) -> float:
+        """
+        Пытается забрать токен.
+
+        Returns:
+            float: 0, если токен получен, иначе время до появления токена в секундах
+        """
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def take(self) -> None:
+        """Ждет и забирает токен; ожидающие обслуживаются в порядке поступления."""
+        async with self._lock:
+            while True:
+                delay = self.try_take()
+                if not delay:
+                    return
+                await asyncio.sleep(delay)
+
+    def is_full(self, now: float) -> bool:
+        """Проверяет, что корзина полна, то есть ее можно удалить без потери ограничения."""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+class OutboundScheduler(BaseRateLimiter[int]):
+    """
+    Центральная очередь исходящих запросов бота.
+
+    Запросы с chat_id сначала ждут токен корзины своего чата; затем любой запрос
+    ждет токен общей корзины. Общие токены выдаются по приоритету (интерактивные ответы раньше
+    массовых рассылок), а при равном приоритете — в порядке поступления.
+    На RetryAfter выдача токенов приостанавливается на указанное Telegram время,
+    после чего запрос повторяется.
+    """
+
+    def __init__(self, global_rate: float = GLOBAL_RATE, chat_rate: float = CHAT_RATE,
+                 group_rate: float = GROUP_RATE, max_retries: int = MAX_RETRIES):
+        """
+        Инициализация планировщика.
+
+        Args:
+            global_rate: Запросов в секунду на всего бота
+            chat_rate: Запросов в секунду в личный чат
+            group_rate: Запросов в секунду в группу
+            max_retries: Число повторов после RetryAfter
+        """
+        self.global_bucket = TokenBucket(global_rate, GLOBAL_BURST)
+        self.chat_rate = chat_rate
+        self.group_rate = group_rate
+        self.max_retries = max_retries
+        self._chat_buckets: Dict[Any, TokenBucket] = {}
+        # Ожидающие общего токена: (приоритет, порядковый номер, future)
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self.waiting = 0
+        self.sent = 0
+        self.retries = 0
+
+    async def initialize(self) -> None:
+        """Ресурсы создаются по мере необходимости."""
+
+    async def shutdown(self) -> None:
+        """Останавливает выдачу токенов и отменяет ожидающие запросы."""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            self._dispatcher = None
+        for _, _, waiter in self._waiters:
+            if not waiter.done():
+                waiter.cancel()
+        self._waiters.clear()
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        """Возвращает корзину чата, создавая ее при необходимости."""
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self._chat_buckets) >= CHAT_BUCKETS_PRUNE_SIZE:
+                now = time.monotonic()
+                self._chat_buckets = {
+                    key: value for key, value in self._chat_buckets.items() if not value.is_full(now)
+                }
+            is_group = isinstance(chat_id, str) or (isinstance(chat_id, int) and chat_id < 0)
+            if is_group:
+                bucket = TokenBucket(self.group_rate, GROUP_BURST)
+            else:
+                bucket = TokenBucket(self.chat_rate, CHAT_BURST)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def _take_global(self, priority: int) -> None:
+        """Ждет общий токен с учетом приоритета."""
+        if not self._waiters and time.monotonic() >= self._paused_until:
+            if self.global_bucket.try_take() == 0:
+                return
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), waiter))
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        await waiter
+
+    async def _dispatch(self) -> None:
+        """Выдает общие токены ожидающим по приоритету."""
+        while self._waiters:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            delay = self.global_bucket.try_take()
+            if delay:
+                await asyncio.sleep(delay)
+                continue
+            while self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                if not waiter.done():
+                    waiter.set_result(None)
+                    break
+            else:
+                # Токен никому не понадобился — возвращаем его
+                self.global_bucket.tokens += 1
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[int],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        """Выполняет запрос, когда позволяют ограничения, и повторяет его после RetryAfter."""
+        priority = PRIORITY_INTERACTIVE if rate_limit_args is None else rate_limit_args
+        chat_id = data.get("chat_id")
+        attempt = 0
+        while True:
+            # Общий токен и пауза после RetryAfter касаются и запросов без чата
+            # (answerCallbackQuery, answerInlineQuery, getUpdates)
+            started = time.perf_counter()
+            self.waiting += 1
+            try:
+                if chat_id is not None:
+                    await self._chat_bucket(chat_id).take()
+                await self._take_global(priority)
+            finally:
+                self.waiting -= 1
+            metrics.observe("bot_outbound_wait_seconds", time.perf_counter() - started,
+                            priority=str(priority))
+            try:
+                result = await callback(*args, **kwargs)
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                retry_after = e.retry_after
+                delay = retry_after.total_seconds() if isinstance(retry_after, datetime.timedelta) else float(retry_after)
+                self.retries += 1
+                metrics.inc("bot_outbound_retry_after_total", method=endpoint)
+                logger.warning(f"Flood control на {endpoint}: повтор через {delay:.1f} с")
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                await asyncio.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Получает метрики очереди.
+
+        Returns:
+            Dict[str, Any]: Глубина очереди, число отправленных запросов и повторов
+        """
+        return {
+            'queue_depth': len(self._waiters),
+            'waiting': self.waiting,
+            'chats': len(self._chat_buckets),
+            'sent': self.sent,
+            'retries': self.retries,
+            'paused': max(0.0, self._paused_until - time.monotonic()),
+        }
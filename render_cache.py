@@ -0,0 +1,94 @@
+"""
+Модуль кэширования готовых фрагментов сообщений.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# Максимальное количество фрагментов в кэше
+RENDER_CACHE_MAX_SIZE = 20_000
+
+class RenderCache:
+    """
+    LRU-кэш отрисованных фрагментов сообщений.
+
+    Ключ состоит из версии каталога, вида фрагмента и идентификатора сущности,
+    поэтому после перезагрузки каталога старые записи просто перестают
+    запрашиваться и вытесняются новыми.
+    """
+
+    def __init__(self, max_size: int = RENDER_CACHE_MAX_SIZE):
+        """
+        Инициализация кэша.
+
+        Args:
+            max_size: Максимальное количество записей
+        """
+        self.max_size = max_size
+        self._items: "OrderedDict[Tuple[int, str, Hashable], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._kind_hits: Dict[str, int] = {}
+        self._kind_misses: Dict[str, int] = {}
+
+    def get_or_render(self, version: int, kind: str, entity: Hashable, render: Callable[[], Any]) -> Any:
+        """
+        Возвращает фрагмент из кэша или отрисовывает и запоминает его.
+
+        Args:
+            version: Версия каталога
+            kind: Вид фрагмента, например "car" или "type"
+            entity: Идентификатор сущности
+            render: Функция отрисовки, вызываемая при промахе
+
+        Returns:
+            Any: Готовый фрагмент
+        """
+        key = (version, kind, entity)
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                self._kind_hits[kind] = self._kind_hits.get(kind, 0) + 1
+                return self._items[key]
+            self.misses += 1
+            self._kind_misses[kind] = self._kind_misses.get(kind, 0) + 1
+
+        value = render()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self.evicted += 1
+        return value
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        with self._lock:
+            self._items.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Получает метрики кэша.
+
+        Returns:
+            Dict[str, Any]: Размер, счетчики попаданий и промахов, доля попаданий по видам фрагментов
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            stats: Dict[str, Any] = {
+                'size': len(self._items),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evicted': self.evicted,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+            for kind in sorted(set(self._kind_hits) | set(self._kind_misses)):
+                hits = self._kind_hits.get(kind, 0)
+                kind_total = hits + self._kind_misses.get(kind, 0)
+                stats[f'{kind}_hit_rate'] = hits / kind_total if kind_total else 0.0
+            return stats
@@ -0,0 +1,228 @@
+"""
+Модуль хранилищ пользовательских данных.
+"""
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Set, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Параметры пакетной записи в SQLite
+SQLITE_FLUSH_INTERVAL = 0.5
+SQLITE_BATCH_SIZE = 500
+SQLITE_PURGE_INTERVAL = 10 * 60
+
+def _json_default(value: Any) -> Any:
+    """Приводит скаляры numpy/pandas к встроенным типам при сериализации."""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def dump_payload(data: Dict[str, Any]) -> str:
+    """
+    Сериализует данные callback в канонический JSON.
+
+    Args:
+        data: Данные callback
+
+    Returns:
+        str: JSON с отсортированными ключами
+    """
+    return json.dumps(data, sort_keys=True, ensure_ascii=False, default=_json_default)
+
+class MemoryStorage:
+    """Хранилище по умолчанию: данные живут только в памяти процесса."""
+
+    persistent = False
+
+    def load_callback(self, callback_id: str) -> Optional[Dict[str, Any]]:
+        """Загружает данные callback по идентификатору."""
+        return None
+
+    def save_callback(self, callback_id: str, payload: str) -> None:
+        """Сохраняет данные callback."""
+
+    def touch_callback(self, callback_id: str) -> None:
+        """Отмечает обращение к данным callback."""
+
+    def load_users(self) -> Tuple[Set[int], int]:
+        """Загружает множество пользователей и общее число обращений."""
+        return set(), 0
+
+    def add_user(self, user_id: int) -> None:
+        """Сохраняет обращение пользователя."""
+
+    def load_favorites(self) -> Dict[int, List[Dict[str, Any]]]:
+        """Загружает избранное всех пользователей."""
+        return {}
+
+    def save_favorites(self, user_id: int, favorites: List[Dict[str, Any]]) -> None:
+        """Сохраняет избранное пользователя."""
+
+    def close(self) -> None:
+        """Освобождает ресурсы хранилища."""
+
+class SQLiteStorage(MemoryStorage):
+    """
+    Хранилище в SQLite (режим WAL).
+
+    Запись выполняется пакетами в фоновом потоке, а чтение данных callback
+    вызывающая сторона выполняет в пуле потоков, поэтому обработчики не ждут диска.
+    """
+
+    persistent = True
+
+    def __init__(self, path: str, callback_ttl: float = 7 * 24 * 60 * 60):
+        """
+        Инициализация хранилища.
+
+        Args:
+            path: Путь к файлу базы данных
+            callback_ttl: Время жизни данных callback в секундах
+        """
+        self.path = path
+        self.callback_ttl = callback_ttl
+        self._read_conn = self._connect()
+        self._read_lock = threading.Lock()
+        self._create_schema()
+        self._queue: "queue.Queue[Optional[Tuple[str, Tuple[Any, ...]]]]" = queue.Queue()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="sqlite-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"[SQLiteStorage] Хранилище открыто: {path}")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает соединение с настройками WAL."""
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _create_schema(self) -> None:
+        """Создает таблицы, если их еще нет."""
+        with self._read_lock:
+            self._read_conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS callbacks (
+                    id TEXT PRIMARY KEY,
+                    payload TEXT NOT NULL,
+                    touched REAL NOT NULL
+                );
+                DROP INDEX IF EXISTS callbacks_payload;
+                CREATE INDEX IF NOT EXISTS callbacks_touched ON callbacks (touched);
+                CREATE TABLE IF NOT EXISTS users (user_id INTEGER PRIMARY KEY);
+                CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+                CREATE TABLE IF NOT EXISTS favorites (user_id INTEGER PRIMARY KEY, items TEXT NOT NULL);
+                """
+            )
+
+    def _fetchone(self, sql: str, params: Tuple[Any, ...]) -> Optional[Tuple[Any, ...]]:
+        """Выполняет запрос на чтение и возвращает первую строку."""
+        with self._read_lock:
+            return self._read_conn.execute(sql, params).fetchone()
+
+    def _enqueue(self, sql: str, params: Tuple[Any, ...]) -> None:
+        """Ставит запрос на запись в очередь фонового потока."""
+        if self._closed:
+            logger.warning("[SQLiteStorage] Запись после закрытия хранилища пропущена")
+            return
+        self._queue.put((sql, params))
+
+    def load_callback(self, callback_id: str) -> Optional[Dict[str, Any]]:
+        row = self._fetchone(
+            "SELECT payload FROM callbacks WHERE id = ? AND touched >= ?",
+            (callback_id, time.time() - self.callback_ttl)
+        )
+        return json.loads(row[0]) if row else None
+
+    def save_callback(self, callback_id: str, payload: str) -> None:
+        self._enqueue(
+            "INSERT OR IGNORE INTO callbacks (id, payload, touched) VALUES (?, ?, ?)",
+            (callback_id, payload, time.time())
+        )
+
+    def touch_callback(self, callback_id: str) -> None:
+        self._enqueue("UPDATE callbacks SET touched = ? WHERE id = ?", (time.time(), callback_id))
+
+    def load_users(self) -> Tuple[Set[int], int]:
+        with self._read_lock:
+            users = {row[0] for row in self._read_conn.execute("SELECT user_id FROM users")}
+            row = self._read_conn.execute(
+                "SELECT value FROM counters WHERE name = 'all_users_count'"
+            ).fetchone()
+        return users, (row[0] if row else 0)
+
+    def add_user(self, user_id: int) -> None:
+        self._enqueue("INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,))
+        self._enqueue(
+            "INSERT INTO counters (name, value) VALUES ('all_users_count', 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            ()
+        )
+
+    def load_favorites(self) -> Dict[int, List[Dict[str, Any]]]:
+        with self._read_lock:
+            rows = self._read_conn.execute("SELECT user_id, items FROM favorites").fetchall()
+        return {user_id: json.loads(items) for user_id, items in rows}
+
+    def save_favorites(self, user_id: int, favorites: List[Dict[str, Any]]) -> None:
+        self._enqueue(
+            "INSERT OR REPLACE INTO favorites (user_id, items) VALUES (?, ?)",
+            (user_id, json.dumps(favorites, ensure_ascii=False, default=_json_default))
+        )
+
+    def _write_loop(self) -> None:
+        """Фоновый поток: собирает запросы в пакеты и записывает их одной транзакцией."""
+        conn = self._connect()
+        last_purge = 0.0
+        stopping = False
+        while not stopping:
+            batch = []
+            try:
+                item = self._queue.get(timeout=SQLITE_FLUSH_INTERVAL)
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+                while len(batch) < SQLITE_BATCH_SIZE:
+                    item = self._queue.get_nowait()
+                    if item is None:
+                        stopping = True
+                        break
+                    batch.append(item)
+            except queue.Empty:
+                pass
+
+            now = time.time()
+            if now - last_purge >= SQLITE_PURGE_INTERVAL:
+                batch.append(("DELETE FROM callbacks WHERE touched < ?", (now - self.callback_ttl,)))
+                last_purge = now
+            if not batch:
+                continue
+            try:
+                conn.execute("BEGIN")
+                for sql, params in batch:
+                    conn.execute(sql, params)
+                conn.execute("COMMIT")
+            except Exception as e:
+                logger.error(f"[SQLiteStorage] Ошибка при пакетной записи ({len(batch)} запросов): {e}")
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+        conn.close()
+
+    def close(self) -> None:
+        """Дописывает очередь на диск и закрывает соединения."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        with self._read_lock:
+            self._read_conn.close()
+        logger.info("[SQLiteStorage] Хранилище закрыто")
@@ -3,13 +3,80 @@
 """
 import os
 import threading
-import time
 import logging
 import pandas as pd
-from typing import Dict, Optional
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, Mapping, Optional
+
+from utils.file_watcher import FileWatcher
 
 logger = logging.getLogger(__name__)
 
+class SynonymSnapshot:
+    """
+    Неизменяемый снимок синонимов одной версии.
+    
+    Содержит готовые словари "синоним -> каноническое имя" целиком и отдельно
+    для марок и моделей, чтобы обработчики находили каноническое имя за O(1).
+    """
+    
+    def __init__(self, version: int, aliases: Dict[str, str], brands: FrozenSet[str] = frozenset()):
+        """
+        Инициализация снимка.
+        
+        Args:
+            version: Номер версии
+            aliases: Словарь "синоним -> каноническое имя" (в нижнем регистре)
+            brands: Известные марки автомобилей (в нижнем регистре)
+        """
+        self.version = version
+        self.aliases = aliases
+        # Представление только для чтения, которое отдается обработчикам без копирования
+        self.view: Mapping[str, str] = MappingProxyType(aliases)
+        self.brands = brands
+        if brands:
+            self.brand_aliases = {alias: canon for alias, canon in aliases.items() if canon in brands}
+        else:
+            # Список марок еще не передан — считаем маркой любое каноническое имя
+            self.brand_aliases = dict(aliases)
+        self.model_aliases = {alias: canon for alias, canon in aliases.items() if alias not in self.brand_aliases}
+    
+    def resolve(self, text: str) -> Optional[str]:
+        """
+        Возвращает каноническое имя для синонима.
+        
+        Args:
+            text: Текст запроса
+            
+        Returns:
+            Optional[str]: Каноническое имя или None, если синоним не найден
+        """
+        return self.aliases.get(text.strip().lower())
+    
+    def resolve_brand(self, text: str) -> Optional[str]:
+        """
+        Возвращает каноническое название марки для синонима.
+        
+        Args:
+            text: Текст запроса
+            
+        Returns:
+            Optional[str]: Каноническое название марки или None
+        """
+        return self.brand_aliases.get(text.strip().lower())
+    
+    def resolve_model(self, text: str) -> Optional[str]:
+        """
+        Возвращает каноническое название модели для синонима.
+        
+        Args:
+            text: Текст запроса
+            
+        Returns:
+            Optional[str]: Каноническое название модели или None
+        """
+        return self.model_aliases.get(text.strip().lower())
+
 class SynonymManager:
     """Класс для управления синонимами."""
     
@@ -19,16 +86,16 @@ class SynonymManager:
         
         Args:
             filepath: Путь к файлу с синонимами
-            reload_interval: Интервал перезагрузки синонимов в секундах
+            reload_interval: Интервал опроса файла в секундах, если inotify недоступен
         """
         self.filepath = filepath
         self.reload_interval = reload_interval
-        self._synonyms: Dict[str, str] = {}
+        self._brands: FrozenSet[str] = frozenset()
+        self._snapshot = SynonymSnapshot(0, {})
         self._last_mtime: Optional[float] = None
         self._lock = threading.Lock()
-        self._stop = False
+        self._watcher: Optional[FileWatcher] = None
         self.reload_synonyms()
-        threading.Thread(target=self._watch, daemon=True).start()
 
     def reload_synonyms(self) -> None:
         """Перезагружает синонимы из файла."""
@@ -46,33 +113,68 @@ class SynonymManager:
                         synonyms[syn] = base
                     synonyms[base] = base
                 with self._lock:
-                    self._synonyms = synonyms
+                    self._snapshot = SynonymSnapshot(self._snapshot.version + 1, synonyms, self._brands)
                     self._last_mtime = mtime
                 logger.info(f"[SynonymManager] Синонимы перезагружены, {len(synonyms)} записей")
         except Exception as e:
             logger.error(f"[SynonymManager] Ошибка при перезагрузке синонимов: {e}")
 
-    def get_synonyms(self) -> Dict[str, str]:
+    def set_known_brands(self, brands: Iterable[str]) -> None:
+        """
+        Передает список марок из каталога для разделения синонимов на марки и модели.
+        
+        Args:
+            brands: Названия марок автомобилей
+        """
+        brands = frozenset(str(brand).strip().lower() for brand in brands)
+        with self._lock:
+            if brands == self._brands:
+                return
+            self._brands = brands
+            self._snapshot = SynonymSnapshot(self._snapshot.version + 1, self._snapshot.aliases, brands)
+        logger.info(f"[SynonymManager] Обновлен список марок: {len(brands)}")
+    
+    def get_snapshot(self) -> SynonymSnapshot:
+        """
+        Получает текущий снимок синонимов.
+        
+        Returns:
+            SynonymSnapshot: Снимок, который не меняется после публикации
+        """
+        return self._snapshot
+    
+    @property
+    def version(self) -> int:
+        """Номер текущей версии синонимов."""
+        return self._snapshot.version
+    
+    def get_synonyms(self) -> Mapping[str, str]:
         """
         Получает словарь синонимов.
         
+        Чтение не берет блокировку и не копирует данные: снимок подменяется
+        целиком одной операцией присваивания при перезагрузке.
+        
         Returns:
-            Dict[str, str]: Словарь синонимов
+            Mapping[str, str]: Словарь синонимов только для чтения
         """
-        with self._lock:
-            return dict(self._synonyms)
+        return self._snapshot.view
 
-    def _watch(self) -> None:
-        """Фоновый поток для отслеживания изменений в файле синонимов."""
-        while not self._stop:
-            self.reload_synonyms()
-            time.sleep(self.reload_interval)
+    async def start(self) -> None:
+        """Запускает отслеживание изменений файла синонимов в цикле событий приложения."""
+        if self._watcher is not None:
+            return
+        self._watcher = FileWatcher(self.filepath, self.reload_synonyms, self.reload_interval)
+        await self._watcher.start()
 
-    def stop(self) -> None:
-        """Останавливает фоновый поток."""
-        self._stop = True
+    async def stop(self) -> None:
+        """Останавливает отслеживание изменений файла синонимов."""
+        if self._watcher is None:
+            return
+        await self._watcher.stop()
+        self._watcher = None
 
-def apply_synonyms(parts: list, synonyms: Dict[str, str]) -> list:
+def apply_synonyms(parts: list, synonyms: Mapping[str, str]) -> list:
     # Сначала ищем по всей строке (соединённые слова)
     joined = " ".join(parts).lower()
     if joined in synonyms:
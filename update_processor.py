@@ -0,0 +1,95 @@
+"""
+Модуль параллельной обработки обновлений с сохранением порядка внутри чата.
+"""
+import asyncio
+from typing import Any, Awaitable, Dict, List, Optional
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+# Ограничение по умолчанию на число одновременно обрабатываемых обновлений
+DEFAULT_CONCURRENT_UPDATES = 16
+# Ограничение семафора базового класса: ожидающие своей очереди обновления не должны занимать слоты
+_PENDING_UPDATES_LIMIT = 1_000_000
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обрабатывает обновления разных чатов параллельно, а обновления одного чата — строго по очереди.
+
+    Сначала обновление ждет своей очереди в чате, и только затем занимает один из
+    limit слотов (семафор базового класса намеренно не ограничивает ожидающих).
+    Поэтому серия нажатий одного пользователя не занимает слоты, пока ждет,
+    и не задерживает остальных, а флаги context.user_data (waiting_for_brand,
+    waiting_for_feedback) меняются в том же порядке, в каком пришли сообщения.
+    """
+
+    def __init__(self, max_concurrent_updates: int = DEFAULT_CONCURRENT_UPDATES):
+        """
+        Инициализация обработчика.
+
+        Args:
+            max_concurrent_updates: Максимальное число одновременно обрабатываемых обновлений
+        """
+        super().__init__(_PENDING_UPDATES_LIMIT)
+        self.limit = max_concurrent_updates
+        self._slots = asyncio.BoundedSemaphore(max_concurrent_updates)
+        # Ключ чата -> [блокировка, число обновлений, ожидающих или выполняющихся]
+        self._chat_locks: Dict[Any, List[Any]] = {}
+        self.active = 0
+
+    @staticmethod
+    def _chat_key(update: object) -> Optional[Any]:
+        """Возвращает ключ очереди: чат, а для обновлений без чата — пользователь."""
+        if not isinstance(update, Update):
+            return None
+        if update.effective_chat is not None:
+            return update.effective_chat.id
+        if update.effective_user is not None:
+            return ("user", update.effective_user.id)
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        """Выполняет обработку после предыдущих обновлений того же чата и при наличии свободного слота."""
+        key = self._chat_key(update)
+        if key is None:
+            await self._run(coroutine)
+            return
+        entry = self._chat_locks.get(key)
+        if entry is None:
+            entry = self._chat_locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await self._run(coroutine)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._chat_locks[key]
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        """Выполняет обработку, заняв слот."""
+        async with self._slots:
+            self.active += 1
+            try:
+                await coroutine
+            finally:
+                self.active -= 1
+
+    async def initialize(self) -> None:
+        """Ресурсы не требуются."""
+
+    async def shutdown(self) -> None:
+        """Ресурсы не требуются."""
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Получает текущую загрузку.
+
+        Returns:
+            Dict[str, int]: Лимит, число выполняющихся обновлений и чатов с очередью
+        """
+        return {
+            'max_concurrent': self.limit,
+            'active': self.active,
+            'queued_chats': len(self._chat_locks),
+        }
@@ -1,13 +1,24 @@
 """
 Модуль для управления пользовательскими данными.
 """
+import asyncio
 import logging
 import random
 import string
-from typing import Dict, List, Set, Any, Optional
+import time
+from collections import OrderedDict
+from typing import Dict, List, Set, Any, Optional, Tuple, Hashable
+
+from utils.storage import MemoryStorage, dump_payload
 
 logger = logging.getLogger(__name__)
 
+# Ограничения хранилища callback-данных
+CALLBACK_STORE_MAX_SIZE = 50_000
+CALLBACK_TTL_SECONDS = 7 * 24 * 60 * 60
+# Длина идентификатора callback: 36^12 значений, поэтому совпадение с записью в SQLite практически исключено
+CALLBACK_ID_LENGTH = 12
+
 def random_id(length: int = 6) -> str:
     """
     Генерирует случайный идентификатор.
@@ -20,15 +31,182 @@ def random_id(length: int = 6) -> str:
     """
     return ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
+def payload_key(data: Dict[str, Any]) -> Tuple[Tuple[str, Hashable], ...]:
+    """
+    Строит компактный хешируемый ключ для данных callback.
+    
+    Args:
+        data: Данные callback
+        
+    Returns:
+        Tuple: Отсортированные пары (ключ, значение)
+    """
+    items = []
+    for key, value in sorted(data.items()):
+        try:
+            hash(value)
+        except TypeError:
+            value = repr(value)
+        items.append((key, value))
+    return tuple(items)
+
+class CallbackStore:
+    """Ограниченное хранилище данных callback с вытеснением по LRU и TTL."""
+    
+    def __init__(self, max_size: int = CALLBACK_STORE_MAX_SIZE, ttl: float = CALLBACK_TTL_SECONDS,
+                 storage: Optional[MemoryStorage] = None):
+        """
+        Инициализация хранилища.
+        
+        Args:
+            max_size: Максимальное количество записей
+            ttl: Время жизни записи в секундах с момента последнего обращения
+            storage: Постоянное хранилище, в которое дублируются записи
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.storage = storage or MemoryStorage()
+        # callback_id -> (время последнего обращения, данные); порядок — от старых к новым
+        self._items: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._by_payload: Dict[Tuple[Tuple[str, Hashable], ...], str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.reused = 0
+        self.evicted = 0
+        self.expired = 0
+        self.restored = 0
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def put(self, data: Dict[str, Any]) -> str:
+        """
+        Сохраняет данные и возвращает идентификатор; одинаковые данные получают один идентификатор.
+        
+        Args:
+            data: Данные для сохранения
+            
+        Returns:
+            str: Идентификатор сохраненных данных
+        """
+        now = time.monotonic()
+        self._expire(now)
+        key = payload_key(data)
+        callback_id = self._by_payload.get(key)
+        if callback_id is not None:
+            self._items[callback_id] = (now, self._items[callback_id][1])
+            self._items.move_to_end(callback_id)
+            self.storage.touch_callback(callback_id)
+            self.reused += 1
+            return callback_id
+        
+        # Запросы к SQLite здесь не выполняются: запись уходит в фоновый поток,
+        # а случайное совпадение с сохраненным идентификатором не перезапишет его (INSERT OR IGNORE)
+        callback_id = random_id(CALLBACK_ID_LENGTH)
+        while callback_id in self._items:
+            callback_id = random_id(CALLBACK_ID_LENGTH)
+        self._insert(callback_id, dict(data), now)
+        if self.storage.persistent:
+            self.storage.save_callback(callback_id, dump_payload(data))
+        return callback_id
+    
+    async def restore(self, callback_id: str) -> None:
+        """
+        Подгружает из постоянного хранилища данные кнопки, отправленной до перезапуска.
+        
+        Чтение выполняется в пуле потоков; вызывается перед get для идентификатора из нажатой кнопки.
+        
+        Args:
+            callback_id: Идентификатор callback
+        """
+        if not self.storage.persistent or callback_id in self._items:
+            return
+        data = await asyncio.to_thread(self.storage.load_callback, callback_id)
+        if data is None or callback_id in self._items:
+            return
+        self._insert(callback_id, data, time.monotonic())
+        self.storage.touch_callback(callback_id)
+        self.restored += 1
+    
+    def get(self, callback_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Получает данные по идентификатору и продлевает срок их жизни.
+        
+        Args:
+            callback_id: Идентификатор callback
+            
+        Returns:
+            Optional[Dict[str, Any]]: Данные callback или None, если не найдены или устарели
+        """
+        now = time.monotonic()
+        self._expire(now)
+        entry = self._items.get(callback_id)
+        if entry is None:
+            # Кнопки, отправленные до перезапуска, заранее подгружаются через restore
+            self.misses += 1
+            return None
+        self._items[callback_id] = (now, entry[1])
+        self._items.move_to_end(callback_id)
+        self.storage.touch_callback(callback_id)
+        self.hits += 1
+        return entry[1]
+    
+    def _insert(self, callback_id: str, data: Dict[str, Any], now: float) -> None:
+        """Добавляет запись в память и вытесняет лишние по LRU."""
+        self._items[callback_id] = (now, data)
+        self._by_payload[payload_key(data)] = callback_id
+        while len(self._items) > self.max_size:
+            self._pop_oldest()
+            self.evicted += 1
+    
+    def _expire(self, now: float) -> None:
+        """Удаляет записи, к которым не обращались дольше TTL."""
+        while self._items:
+            oldest_ts = next(iter(self._items.values()))[0]
+            if now - oldest_ts <= self.ttl:
+                break
+            self._pop_oldest()
+            self.expired += 1
+    
+    def _pop_oldest(self) -> None:
+        """Удаляет самую давнюю запись вместе с её ключом дедупликации."""
+        _, (_, data) = self._items.popitem(last=False)
+        self._by_payload.pop(payload_key(data), None)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Получает метрики хранилища.
+        
+        Returns:
+            Dict[str, int]: Размер хранилища и счетчики обращений
+        """
+        return {
+            'size': len(self._items),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'reused': self.reused,
+            'evicted': self.evicted,
+            'expired': self.expired,
+            'restored': self.restored,
+        }
+
 class UserManager:
     """Класс для управления пользовательскими данными."""
     
-    def __init__(self):
-        """Инициализация менеджера пользователей."""
-        self.unique_users: Set[int] = set()
-        self.all_users_count: int = 0
-        self.callback_storage: Dict[str, Dict[str, Any]] = {}
-        self.favorites: Dict[int, List[Dict[str, Any]]] = {}
+    def __init__(self, storage: Optional[MemoryStorage] = None):
+        """
+        Инициализация менеджера пользователей.
+        
+        Args:
+            storage: Постоянное хранилище; по умолчанию данные хранятся только в памяти
+        """
+        self.storage = storage or MemoryStorage()
+        self.unique_users: Set[int]
+        self.all_users_count: int
+        self.unique_users, self.all_users_count = self.storage.load_users()
+        self.callback_storage = CallbackStore(storage=self.storage)
+        self.favorites: Dict[int, List[Dict[str, Any]]] = self.storage.load_favorites()
     
     def get_models_for_brand(self, brand: str) -> list:
         """
@@ -47,6 +225,7 @@ class UserManager:
         """
         self.unique_users.add(user_id)
         self.all_users_count += 1
+        self.storage.add_user(user_id)
     
     def store_callback_data(self, data: Dict[str, Any]) -> str:
         """
@@ -58,9 +237,7 @@ class UserManager:
         Returns:
             str: Идентификатор сохраненных данных
         """
-        callback_id = random_id()
-        self.callback_storage[callback_id] = data
-        return callback_id
+        return self.callback_storage.put(data)
     
     def get_callback_data(self, callback_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -74,7 +251,41 @@ class UserManager:
         """
         return self.callback_storage.get(callback_id)
     
-
+    async def restore_callback_data(self, callback_id: str) -> None:
+        """
+        Подгружает из постоянного хранилища данные callback, созданные до перезапуска.
+        
+        Args:
+            callback_id: Идентификатор callback
+        """
+        await self.callback_storage.restore(callback_id)
+    
+    def get_favorites(self, user_id: int) -> List[Dict[str, Any]]:
+        """
+        Получает избранное пользователя.
+        
+        Args:
+            user_id: ID пользователя
+            
+        Returns:
+            List[Dict[str, Any]]: Список избранных записей
+        """
+        return self.favorites.get(user_id, [])
+    
+    def set_favorites(self, user_id: int, favorites: List[Dict[str, Any]]) -> None:
+        """
+        Сохраняет избранное пользователя.
+        
+        Args:
+            user_id: ID пользователя
+            favorites: Список избранных записей
+        """
+        self.favorites[user_id] = favorites
+        self.storage.save_favorites(user_id, favorites)
+    
+    def close(self) -> None:
+        """Дописывает отложенные изменения и закрывает хранилище."""
+        self.storage.close()
     
     def get_stats(self) -> Dict[str, int]:
         """
@@ -83,7 +294,9 @@ class UserManager:
         Returns:
             Dict[str, int]: Статистика пользователей
         """
-        return {
+        stats = {
             'unique_users': len(self.unique_users),
             'all_users_count': self.all_users_count
         }
+        stats.update({f"callbacks_{name}": value for name, value in self.callback_storage.get_stats().items()})
+        return stats
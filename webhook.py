@@ -0,0 +1,89 @@
+"""
+Модуль приема обновлений Telegram через вебхук.
+"""
+import hmac
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from telegram import Update
+from telegram.ext import Application
+
+from utils.http_server import HttpServer, HttpRequest, HttpResponse
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Заголовок, в котором Telegram передает secret_token, указанный в setWebhook
+SECRET_TOKEN_HEADER = "x-telegram-bot-api-secret-token"
+
+class WebhookServer:
+    """
+    HTTP-сервер вебхука: принимает JSON обновлений и передает их в очередь приложения.
+
+    Кроме пути вебхука обслуживает GET /health для балансировщика. Для локальной
+    проверки достаточно отправить POST с записанным JSON обновления на путь вебхука.
+    """
+
+    def __init__(self, application: Application, host: str, port: int, path: str,
+                 secret_token: Optional[str] = None,
+                 health: Optional[Callable[[], Dict[str, Any]]] = None):
+        """
+        Инициализация сервера.
+
+        Args:
+            application: Приложение, в очередь которого передаются обновления
+            host: Адрес для прослушивания
+            port: Порт
+            path: Путь вебхука, например "/telegram"
+            secret_token: Ожидаемое значение заголовка X-Telegram-Bot-Api-Secret-Token; None — без проверки
+            health: Функция, возвращающая дополнительные сведения для /health
+        """
+        self.application = application
+        self.path = path if path.startswith("/") else f"/{path}"
+        self.secret_token = secret_token
+        self.health = health
+        self.server = HttpServer(host, port)
+        self.server.add_route("POST", self.path, self._handle_update)
+        self.server.add_route("GET", "/health", self._handle_health)
+
+    async def start(self) -> None:
+        """Запускает HTTP-сервер."""
+        await self.server.start()
+        logger.info(f"Вебхук принимает обновления на {self.server.host}:{self.server.port}{self.path}")
+
+    async def stop(self) -> None:
+        """Останавливает HTTP-сервер."""
+        await self.server.stop()
+
+    async def _handle_update(self, request: HttpRequest) -> HttpResponse:
+        """Проверяет секрет, разбирает обновление и ставит его в очередь приложения."""
+        if self.secret_token is not None:
+            received = request.headers.get(SECRET_TOKEN_HEADER, "")
+            if not hmac.compare_digest(received.encode(), self.secret_token.encode()):
+                metrics.inc("bot_webhook_rejected_total", reason="secret")
+                return HttpResponse(403)
+        try:
+            data = json.loads(request.body.decode("utf-8"))
+            update = Update.de_json(data, self.application.bot)
+        except Exception as e:
+            logger.warning(f"Некорректное обновление в вебхуке: {e}")
+            metrics.inc("bot_webhook_rejected_total", reason="payload")
+            return HttpResponse(400)
+        if update is None:
+            return HttpResponse(400)
+        await self.application.update_queue.put(update)
+        metrics.inc("bot_webhook_updates_total")
+        return HttpResponse(200)
+
+    async def _handle_health(self, request: HttpRequest) -> HttpResponse:
+        """Сообщает, что приложение запущено, и отдает краткие сведения о состоянии."""
+        status = {
+            "status": "ok" if self.application.running else "starting",
+            "update_queue": self.application.update_queue.qsize(),
+        }
+        if self.health is not None:
+            status.update(self.health())
+        code = 200 if self.application.running else 503
+        return HttpResponse(code, json.dumps(status, ensure_ascii=False).encode("utf-8"),
+                            "application/json; charset=utf-8")